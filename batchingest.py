@@ -0,0 +1,200 @@
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pandas as pd
+from cohortstore import CohortStore, cohort_directory
+from instrumentation import StageProfiler, emit
+from transcriptreader import INSTITUTIONS, REPLACEMENT_POLICIES, detect_institution
+
+
+STUDENT_NUMBER = re.compile(r"Student Number:\s*(\d+)")
+
+
+def student_number(content: list[str]) -> str | None:
+    for line in content:
+        match = STUDENT_NUMBER.search(line)
+        if match:
+            return match.group(1)
+    return None
+
+
+# Runs inside a worker process; any failure is returned rather than raised
+# so that one unreadable transcript does not abort the batch. Stage records
+# are returned to the parent, which owns logging. With `cohort`, the content
+# hash and every course row (replaced attempts included) are returned too.
+def parse_transcript(
+        path: str,
+        profile: bool = False,
+        cohort: bool = False,
+        policy: str = "highest",
+    ) -> tuple[str, pd.DataFrame | None, str | None, list[dict], tuple[str, pd.DataFrame] | None]:
+
+    profiler = StageProfiler(enabled=profile, context={"file": path})
+    try:
+        institution = profiler.run("detect_institution", detect_institution, path)
+        if institution is None:
+            raise ValueError("not a transcript from a supported institution")
+        institution_class = INSTITUTIONS[institution]
+        content = profiler.run("validate_pdf", institution_class.validate_pdf, path)
+        df_all_courses = profiler.run("parse_courses", institution_class.parse_courses, content)
+        df = profiler.run("remove_replacements", institution_class.remove_replacements, df_all_courses, policy)
+        extra = None
+        if cohort:
+            with open(path, "rb") as f:
+                extra = (hashlib.file_digest(f, "sha256").hexdigest(), df_all_courses)
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}", profiler.records, None
+
+    df.insert(0, "Student Number", student_number(content))
+    df.insert(0, "Institution", institution)
+    df.insert(0, "File", path)
+    return path, df, None, profiler.records, extra
+
+
+def find_transcripts(inputs: list[str]) -> list[str]:
+    paths = []
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            paths.extend(sorted(str(f) for f in p.rglob("*") if f.suffix.lower() == ".pdf"))
+        else:
+            paths.append(str(p))
+    return paths
+
+
+def ingest(
+        paths: list[str],
+        workers: int | None = None,
+        max_in_flight: int | None = None,
+        profile: bool = False,
+        cohort: str | None = None,
+        policy: str = "highest",
+    ) -> tuple[pd.DataFrame, dict[str, str]]:
+
+    workers = workers or os.cpu_count() or 1
+    limit = max_in_flight or workers * 2
+
+    # One cohort store per institution under `cohort`, opened on first use
+    frames, errors, stores = [], {}, {}
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending: dict[Future, str] = {}
+
+        # Keep at most `limit` files submitted at any time
+        for path in paths:
+            try:
+                future = pool.submit(parse_transcript, path, profile, cohort is not None, policy)
+            except BrokenProcessPool:
+                # A worker died: the files it had in flight fail with the
+                # pool, and the rest of the batch goes to a fresh one
+                pool.shutdown(wait=False)
+                pool = ProcessPoolExecutor(max_workers=workers)
+                future = pool.submit(parse_transcript, path, profile, cohort is not None, policy)
+            pending[future] = path
+            if len(pending) < limit:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                _collect(future, pending.pop(future), frames, errors, cohort, stores)
+
+        for future in wait(pending).done:
+            _collect(future, pending[future], frames, errors, cohort, stores)
+    finally:
+        pool.shutdown()
+
+    for store in stores.values():
+        store.flush()
+
+    if frames:
+        combined = pd.concat(frames, ignore_index=True)
+        combined = combined.sort_values("File", kind="stable").reset_index(drop=True)
+    else:
+        combined = pd.DataFrame(columns=["File", "Institution", "Student Number", "Course Code", "Course Name",
+                                         "Credits", "Grade", "Letter Grade", "Major", "Replaced"])
+    return combined, errors
+
+
+# Failures from the pool itself (a worker that died, an unpicklable
+# result) are reported against the file like parse errors
+def _collect(
+        future: Future,
+        path: str,
+        frames: list[pd.DataFrame],
+        errors: dict[str, str],
+        cohort: str | None,
+        stores: dict[str, CohortStore],
+    ) -> None:
+
+    try:
+        path, df, error, records, extra = future.result()
+    except Exception as e:
+        df, error, records, extra = None, f"{type(e).__name__}: {e}", [], None
+    emit(records)
+    if error is None:
+        frames.append(df)
+        if cohort is not None:
+            institution = df["Institution"].iat[0]
+            if institution not in stores:
+                institution_class = INSTITUTIONS[institution]
+                stores[institution] = CohortStore(cohort_directory(cohort, institution_class), institution_class)
+            transcript_id, df_all_courses = extra
+            stores[institution].append(transcript_id, df_all_courses, df)
+        print(f"parsed  {path} ({len(df)} courses)", file=sys.stderr)
+    else:
+        errors[path] = error
+        print(f"failed  {path}: {error}", file=sys.stderr)
+
+
+def write_output(df: pd.DataFrame, output: str) -> None:
+    df = df.astype({"File": "string", "Institution": "string", "Student Number": "string"})
+    if Path(output).suffix.lower() in (".arrow", ".feather", ".ipc"):
+        df.to_feather(output)
+    else:
+        df.to_parquet(output, index=False)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Parse unofficial transcripts in bulk, routing each file to its institution's parser.",
+    )
+    parser.add_argument("inputs", nargs="+", help="PDF files or directories of PDF files")
+    parser.add_argument("-o", "--output", default="transcripts.parquet",
+                        help="Output file (.parquet, or .arrow/.feather for Arrow IPC)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Maximum files queued to the pool at once (default: 2x workers)")
+    parser.add_argument("--policy", choices=REPLACEMENT_POLICIES, default="highest",
+                        help="Which attempt of a retaken course counts (default: highest)")
+    parser.add_argument("--cohort", default=None, metavar="DIR",
+                        help="Also append the parsed transcripts to the cohort analytics stores under DIR, "
+                             "one subdirectory per institution")
+    parser.add_argument("--profile", action="store_true",
+                        help="Log per-stage timing and memory for every file as JSON lines on stderr")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    paths = find_transcripts(args.inputs)
+    if not paths:
+        print("No PDF transcripts found.", file=sys.stderr)
+        return 1
+
+    df, errors = ingest(paths, args.workers, args.max_in_flight, args.profile, args.cohort, args.policy)
+    write_output(df, args.output)
+
+    print(f"{len(paths) - len(errors)}/{len(paths)} transcripts, {len(df)} courses -> {args.output}",
+          file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
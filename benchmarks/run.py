@@ -0,0 +1,138 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pypdf
+from streamlit import config, logger
+from benchmarks.synthetic import transcript_lines, transcript_pages, write_pdf
+from transcriptreader import TrentUniversity, resolve_replacements
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+# The app module's filename is not importable by name. Outside `streamlit run`
+# its st.* calls are no-ops that only log warnings, which are silenced here.
+def load_app():
+    spec = importlib.util.spec_from_file_location("transcript_gpa_utility", ROOT / "transcript-gpa-utility.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    config.get_option("logger.level")  # parse config first so it can't reset the level
+    logger.set_log_level("error")
+    return module
+
+
+# Repeats `fn` until `min_time` has elapsed (at least `min_runs` times), then
+# runs it once more under tracemalloc for the peak allocation.
+def measure(fn, min_runs: int = 3, min_time: float = 0.2) -> dict:
+    times, start = [], time.perf_counter()
+    while len(times) < min_runs or time.perf_counter() - start < min_time:
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "runs": len(times),
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+        "peak_bytes": peak,
+    }
+
+
+def bench_size(courses: int, app, workdir: str, min_time: float) -> dict:
+    pdf = os.path.join(workdir, f"transcript_{courses}.pdf")
+    write_pdf(transcript_pages(courses), pdf)
+    lines = transcript_lines(courses)
+
+    df_unprocessed = TrentUniversity.list_to_df(lines)
+    df_all_courses = TrentUniversity.parse_courses(lines)
+    df_gpa_courses = TrentUniversity.remove_replacements(df_all_courses)
+    cohort = pd.concat([df_all_courses.assign(File=i) for i in range(100)], ignore_index=True)
+
+    # A forecast that replaces three existing courses and adds two new ones
+    names = df_gpa_courses["Course Name"].tolist()
+    sim_courses = names[1:4] + ["Planned1", "Planned2"]
+    sim_credits, sim_grades = [0.5, 0.5, 1.0, 0.5, 1.0], [85, 90, 78, 72, 88]
+
+    stages = {
+        "validate_pdf": lambda: TrentUniversity.validate_pdf(pdf),
+        "list_to_df": lambda: TrentUniversity.list_to_df(lines),
+        "clean_dataframe": lambda: TrentUniversity.clean_dataframe(df_unprocessed.copy()),
+        "parse_courses": lambda: TrentUniversity.parse_courses(lines),
+        "remove_replacements": lambda: TrentUniversity.remove_replacements(df_all_courses),
+        "resolve_replacements_x100": lambda: resolve_replacements(cohort, within="File"),
+        "get_average": lambda: TrentUniversity.get_average(df_gpa_courses),
+        "get_gpa": lambda: TrentUniversity.get_gpa(df_gpa_courses.copy()),
+        "simulator": lambda: app.simulator(df_gpa_courses, sim_courses, sim_credits, sim_grades, TrentUniversity),
+    }
+
+    result = {
+        "courses": courses,
+        "lines": len(lines),
+        "pdf_bytes": os.path.getsize(pdf),
+        "rows": {"all_courses": len(df_all_courses), "gpa_courses": len(df_gpa_courses)},
+        "stages": {},
+    }
+    for name, fn in stages.items():
+        result["stages"][name] = measure(fn, min_time=min_time)
+        print(f"{courses:>6} courses  {name:<20} {result['stages'][name]['median_s'] * 1000:10.3f} ms",
+              file=sys.stderr)
+    return result
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the transcript pipeline on synthetic transcripts.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                        help="Numbers of graded courses per synthetic transcript")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="Minimum seconds spent timing each stage")
+    parser.add_argument("-o", "--output", default="bench_results.json",
+                        help="JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    app = load_app()
+    with tempfile.TemporaryDirectory() as workdir:
+        sizes = [bench_size(n, app, workdir, args.min_time) for n in args.sizes]
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "versions": {"pandas": pd.__version__, "numpy": np.__version__, "pypdf": pypdf.__version__},
+        "sizes": sizes,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
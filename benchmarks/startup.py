@@ -0,0 +1,95 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.run import git_commit
+
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ["pandas", "numpy", "pypdf", "plotly.express", "pyarrow"]
+
+# Runs in a fresh interpreter: import streamlit, then the app, then render the
+# first page (the institution selector) in bare mode.
+APP_PROBE = """
+import importlib.util, json, sys, time
+t0 = time.perf_counter()
+import streamlit
+from streamlit import config, logger
+config.get_option("logger.level")
+logger.set_log_level("error")
+t1 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("transcript_gpa_utility", {app!r})
+app = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(app)
+t2 = time.perf_counter()
+app.set_debug_mode, app.profile_stages = False, False
+app.main()
+t3 = time.perf_counter()
+print(json.dumps({{
+    "streamlit_import_s": t1 - t0,
+    "app_import_s": t2 - t1,
+    "first_render_s": t3 - t2,
+    "total_s": t3 - t0,
+    "heavy_modules_loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+MODULE_PROBE = """
+import json, time
+t = time.perf_counter()
+import {module}
+print(json.dumps(time.perf_counter() - t))
+"""
+
+
+def probe(code: str) -> dict | float:
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold start of the Streamlit app in fresh interpreters.")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("-o", "--output", default="startup_results.json", help="JSON file to write results to")
+    args = parser.parse_args(argv)
+
+    code = APP_PROBE.format(app=str(ROOT / "transcript-gpa-utility.py"), heavy=HEAVY_MODULES)
+    runs = [probe(code) for _ in range(args.runs)]
+    app = {
+        key: statistics.median(run[key] for run in runs)
+        for key in ("streamlit_import_s", "app_import_s", "first_render_s", "total_s")
+    }
+    app["heavy_modules_loaded"] = sorted({m for run in runs for m in run["heavy_modules_loaded"]})
+
+    modules = {
+        module: statistics.median(probe(MODULE_PROBE.format(module=module)) for _ in range(args.runs))
+        for module in HEAVY_MODULES
+    }
+
+    for key, value in app.items():
+        print(f"{key:<22} {value if isinstance(value, list) else f'{value * 1000:10.1f} ms'}", file=sys.stderr)
+    for module, seconds in modules.items():
+        print(f"import {module:<15} {seconds * 1000:10.1f} ms", file=sys.stderr)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "app": app,
+        "module_import_s": modules,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
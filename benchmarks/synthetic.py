@@ -0,0 +1,136 @@
+import random
+
+from transcriptreader import TrentUniversity
+
+
+MAJORS = [
+    "Business Administration",
+    "Economics",
+    "Computer Science",
+    "Indigenous Studies",
+    "Media Studies",
+    "Sociology",
+    "Communications",
+    "Political Science",
+    "Philosophy",
+]
+LETTERS = [
+    (90, "A+"), (85, "A"), (80, "A-"), (77, "B+"), (73, "B"), (70, "B-"),
+    (67, "C+"), (63, "C"), (60, "C-"), (57, "D+"), (53, "D"), (50, "D-"), (0, "F"),
+]
+END_OF_RECORD = (
+    " Current Academic Status : Good Standing"
+    + " " * 97
+    + TrentUniversity.END_OF_RECORD
+    + " "
+)
+COURSES_PER_PAGE = 45
+
+
+def letter_grade(grade: int) -> str:
+    return next(letter for level, letter in LETTERS if grade >= level)
+
+
+# Page header as it appears in get_example(), with the page counter filled in
+def page_header(page: int, pages: int) -> list[str]:
+    header = list(TrentUniversity.get_example()[:17])
+    header[5] = f" Page:    {page}  of    {pages}           "
+    return header
+
+
+def course_line(major: str, code: str, name: str, credits: float | None = None,
+                grade: int | str | None = None, replaced: bool = False,
+                honour_roll: bool = False) -> str:
+    line = f" {major:<30} {code}: {name:<16}"
+    if credits is not None:
+        line += f"    {credits:.1f}     {grade}"
+        if isinstance(grade, int):
+            line += f"    {letter_grade(grade):<2}"
+        if replaced:
+            line += "    R"
+    if honour_roll:
+        line += " " * 44 + "DEAN'S HONOUR ROLL"
+    return line + " " * 14
+
+
+# Builds a Trent-format transcript with `courses` graded rows. About 5% of
+# courses (and at least one) are retaken, with the retake carrying the "R"
+# marker; 10% are full credit "Y" courses, and a few pre-registered ("PRE")
+# and in-progress rows close the record.
+def transcript_courses(courses: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    lines, taken, retaken = [], [], False
+    for i in range(courses):
+        if taken and (rng.random() < 0.05 or (i == courses - 1 and not retaken)):
+            retaken = True
+            major, name = rng.choice(taken)
+            lines.append(course_line(major, f"{i:04d} H", name, 0.5,
+                                     rng.randint(60, 100), replaced=True))
+            continue
+
+        major, name = rng.choice(MAJORS), f"Course{i}"
+        full_credit = rng.random() < 0.1
+        taken.append((major, name))
+        lines.append(course_line(
+            major,
+            f"{i:04d} {'Y' if full_credit else 'H'}",
+            name,
+            1.0 if full_credit else 0.5,
+            int(min(100, max(0, rng.gauss(78, 10)))),
+            honour_roll=rng.random() < 0.05,
+        ))
+
+    for j in range(max(1, courses // 50)):
+        lines.append(course_line(rng.choice(MAJORS), f"{courses + j:04d} H", f"Course{courses + j}", 0.5, "PRE"))
+    lines.append(course_line(rng.choice(MAJORS), f"{courses + j + 1:04d} H", f"Course{courses + j + 1}"))
+    return lines
+
+
+def transcript_pages(courses: int, seed: int = 0) -> list[list[str]]:
+    rows = transcript_courses(courses, seed)
+    chunks = [rows[i:i + COURSES_PER_PAGE] for i in range(0, len(rows), COURSES_PER_PAGE)]
+    pages = [page_header(n, len(chunks)) + chunk for n, chunk in enumerate(chunks, 1)]
+    pages[-1].append(END_OF_RECORD)
+    return pages
+
+
+# Line list in the form validate_pdf() returns, ready for list_to_df()
+def transcript_lines(courses: int, seed: int = 0) -> list[str]:
+    return [line for page in transcript_pages(courses, seed) for line in page]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+# Minimal single-font PDF writer; one text line per transcript line.
+def write_pdf(pages: list[list[str]], path: str) -> None:
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+    }
+    kids = []
+    for i, lines in enumerate(pages):
+        page, content = 4 + 2 * i, 5 + 2 * i
+        kids.append(f"{page} 0 R")
+        # The leading space lets the first line split like every other line
+        text = "".join(f"({_escape(line)}) Tj T*\n" for line in [" " + lines[0]] + lines[1:])
+        stream = f"BT /F1 6 Tf 7 TL 20 {20 + 7 * len(lines)} Td\n{text}ET".encode("latin-1")
+        objects[page] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 1000 {40 + 7 * len(lines)}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content} 0 R >>"
+        ).encode()
+        objects[content] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+    xref, size = len(out), max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    out += b"".join(b"%010d 00000 n \n" % offsets[n] for n in range(1, size))
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
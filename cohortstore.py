@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from lazyimport import lazy_import
+from transcriptreader import GRADE_BIN_LABELS, TranscriptReader, grade_bins
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+pa = lazy_import("pyarrow")
+
+
+COLUMNS = ["Transcript", "Course Code", "Course Name", "Credits", "Grade", "Letter Grade", "Major"]
+
+
+# Running count/mean/M2, merged a batch at a time (Chan et al.), so
+# aggregates never need the rows they were built from
+@dataclass
+class Moments:
+    n: float = 0.0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def merge(self, n: float, mean: float, m2: float) -> None:
+        total = self.n + n
+        if total == 0:
+            return
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def variance(self) -> float:
+        return self.m2 / self.n if self.n else 0.0
+
+    def std(self) -> float:
+        return self.variance() ** 0.5
+
+    # Mean and std, or NaN for a group with no rows
+    def describe(self) -> tuple[float, float]:
+        return (self.mean, self.std()) if self.n else (float("nan"), float("nan"))
+
+
+@dataclass
+class CourseStats:
+    grades: Moments = field(default_factory=Moments)
+    histogram: list[int] = field(default_factory=lambda: [0] * len(GRADE_BIN_LABELS))
+    attempts: int = 0
+    replaced: int = 0
+
+
+# Per-group weighted count, mean and M2 of `values` in one pass
+def group_moments(groups: np.ndarray, size: int, values: np.ndarray, weights: np.ndarray):
+    n = np.bincount(groups, weights, minlength=size)
+    mean = np.bincount(groups, weights * values, minlength=size) / np.where(n > 0, n, 1)
+    m2 = np.bincount(groups, weights * (values - mean[groups]) ** 2, minlength=size)
+    return n, mean, m2
+
+
+# One store directory per parser, so grades on different scales are never
+# aggregated together
+def cohort_directory(root: str, institution_class: TranscriptReader) -> Path:
+    return Path(root) / institution_class.__name__
+
+
+# Append-only store of counted course rows across many transcripts.
+#
+# Appended transcripts are buffered and written on flush() as one immutable
+# Arrow IPC segment, sorted by course code. The segment is memory-mapped when
+# read, and an index of (segment, offset, length) ranges per course code lets
+# course_rows() slice only the matching rows. Per-course grade moments and
+# histograms, replacement counts and per-major GPA moments are merged in at
+# flush time, so the query methods never rescan rows. Transcripts are keyed by
+# content hash, so the same transcript is only counted once.
+#
+# Several processes may share a directory: flush() holds an exclusive lock on
+# the directory and merges into the latest state on disk, and queries reload
+# that state whenever another process has replaced it. Once there are more
+# than `max_segments` segments they are compacted into one.
+class CohortStore:
+
+    def __init__(
+            self,
+            directory: str,
+            institution_class: TranscriptReader,
+            segment_rows: int = 65536,
+            max_segments: int = 16,
+            flush_after: float | None = None,
+        ) -> None:
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.institution = institution_class.__name__
+        self.scale = institution_class.scale()
+        self.segment_rows = segment_rows
+        self.max_segments = max_segments
+        self.flush_after = flush_after
+        self._lock = threading.Lock()
+        self._pending: list[tuple[str, pd.DataFrame, pd.DataFrame]] = []
+        self._pending_ids: set[str] = set()
+        self._pending_rows = 0
+        self._pending_since = 0.0
+        self._tables: dict[str, pa.Table] = {}
+        self._version: tuple[int, ...] | None = None
+        self._load_state({})
+        self._refresh()
+
+    def __enter__(self) -> CohortStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+    # Buffered until `segment_rows` rows are pending or, with `flush_after`,
+    # the oldest pending transcript is that many seconds old
+    def append(self, transcript_id: str, df_all_courses: pd.DataFrame, df_gpa_courses: pd.DataFrame) -> bool:
+        with self._lock:
+            if transcript_id in self.transcripts or transcript_id in self._pending_ids:
+                return False
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending_ids.add(transcript_id)
+            df_gpa_courses = df_gpa_courses.assign(Transcript=transcript_id)
+            self._pending.append((transcript_id, df_all_courses, df_gpa_courses))
+            self._pending_rows += len(df_gpa_courses)
+            due = self._pending_rows >= self.segment_rows or (
+                self.flush_after is not None and time.monotonic() - self._pending_since >= self.flush_after
+            )
+        if due:
+            self.flush()
+        return True
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                self._refresh()
+                return
+            pending = self._pending
+            self._pending, self._pending_ids, self._pending_rows = [], set(), 0
+
+            try:
+                with self._directory_lock():
+                    self._refresh()
+                    pending = [entry for entry in pending if entry[0] not in self.transcripts]
+                    if not pending:
+                        return
+                    try:
+                        df_all = pd.concat([df for _, df, _ in pending], ignore_index=True)
+                        df_gpa = pd.concat([df for _, _, df in pending], ignore_index=True)
+                        self.transcripts.update(transcript_id for transcript_id, _, _ in pending)
+                        self._merge_aggregates(df_all, df_gpa)
+                        self._write_segment(df_gpa)
+                        obsolete = self._compact() if len(self.segments) > self.max_segments else []
+                        self._write_state()
+                    except BaseException:
+                        # The in-memory state no longer matches the disk
+                        self._version = None
+                        raise
+            except BaseException:
+                # append() already accepted these; keep them for the next flush
+                self._pending = pending + self._pending
+                self._pending_ids = {transcript_id for transcript_id, _, _ in self._pending}
+                self._pending_rows = sum(len(df) for _, _, df in self._pending)
+                raise
+            self._remove(obsolete)
+
+    # Rewrites every segment as one, dropping the old files once the new
+    # state no longer refers to them
+    def compact(self) -> None:
+        self.flush()
+        with self._lock, self._directory_lock():
+            self._refresh()
+            if len(self.segments) > 1:
+                obsolete = self._compact()
+                self._write_state()
+                self._remove(obsolete)
+
+    def _compact(self) -> list[str]:
+        obsolete = self.segments
+        df = pa.concat_tables([self._table(name) for name in obsolete]).to_pandas()
+        self.segments, self.index = [], {}
+        self._tables.clear()
+        self._write_segment(df)
+        return obsolete
+
+    # A file another process still has mapped may not be removable (Windows);
+    # it is left behind unreferenced
+    def _remove(self, names: list[str]) -> None:
+        for name in names:
+            try:
+                (self.directory / name).unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def _merge_aggregates(self, df_all: pd.DataFrame, df_gpa: pd.DataFrame) -> None:
+        codes, uniques = pd.factorize(df_gpa["Course Code"].astype(str))
+        size = len(uniques)
+        grades = df_gpa["Grade"].to_numpy(dtype=np.float64)
+        n, mean, m2 = group_moments(codes, size, grades, np.ones(len(grades)))
+
+        bins = grade_bins(grades)
+        histograms = np.zeros((size, len(GRADE_BIN_LABELS)), dtype=np.int64)
+        np.add.at(histograms, (codes[bins >= 0], bins[bins >= 0]), 1)
+
+        for i, code in enumerate(uniques):
+            stats = self.courses.setdefault(code, CourseStats())
+            stats.grades.merge(n[i], mean[i], m2[i])
+            stats.histogram = (np.asarray(stats.histogram) + histograms[i]).tolist()
+
+        attempts = df_all.groupby(df_all["Course Code"].astype(str))["Replaced"].agg(["size", "sum"])
+        for code, count, replaced in zip(attempts.index, attempts["size"], attempts["sum"]):
+            stats = self.courses.setdefault(code, CourseStats())
+            stats.attempts += int(count)
+            stats.replaced += int(replaced)
+
+        # Weighted like get_gpa: full credit courses count twice
+        majors, major_names = pd.factorize(df_gpa["Major"].astype(str))
+        gpa = TranscriptReader.gpa_conversion(self.scale, df_gpa["Grade"].to_numpy())
+        weights = np.where(df_gpa["Credits"].to_numpy() == 1, 2.0, 1.0)
+        n, mean, m2 = group_moments(majors, len(major_names), gpa, weights)
+        for i, major in enumerate(major_names):
+            self.majors.setdefault(major, Moments()).merge(n[i], mean[i], m2[i])
+
+    def _write_segment(self, df_gpa: pd.DataFrame) -> None:
+        df = df_gpa[COLUMNS].astype({"Course Code": str, "Major": str})
+        df = df.sort_values("Course Code", kind="stable", ignore_index=True)
+        name = f"segment-{uuid.uuid4().hex}.arrow"
+        path = self.directory / name
+        tmp = path.with_suffix(".tmp")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+
+        self.segments.append(name)
+        codes, offsets, counts = np.unique(df["Course Code"].to_numpy(), return_index=True, return_counts=True)
+        for code, offset, count in zip(codes.tolist(), offsets.tolist(), counts.tolist()):
+            self.index.setdefault(code, []).append((name, offset, count))
+
+    def _table(self, name: str) -> pa.Table:
+        if name not in self._tables:
+            source = pa.memory_map(str(self.directory / name), "r")
+            self._tables[name] = pa.ipc.open_file(source).read_all()
+        return self._tables[name]
+
+    def course_rows(self, code: str) -> pd.DataFrame:
+        self.flush()
+        with self._lock:
+            try:
+                slices = [self._table(name).slice(offset, length) for name, offset, length in self.index.get(code, [])]
+            except FileNotFoundError:
+                # Compacted away by another process since the last reload
+                self._version = None
+                self._refresh()
+                slices = [self._table(name).slice(offset, length) for name, offset, length in self.index.get(code, [])]
+        if not slices:
+            return pd.DataFrame(columns=COLUMNS)
+        return pa.concat_tables(slices).to_pandas()
+
+    def course_distribution(self, code: str) -> dict | None:
+        self.flush()
+        stats = self.courses.get(code)
+        if stats is None:
+            return None
+        mean, std = stats.grades.describe()
+        return {
+            "count": int(stats.grades.n),
+            "mean": round(mean, 4),
+            "std": round(std, 4),
+            "histogram": dict(zip(GRADE_BIN_LABELS, stats.histogram)),
+            "attempts": stats.attempts,
+            "replaced": stats.replaced,
+            "replacement_rate": round(stats.replaced / stats.attempts, 4) if stats.attempts else 0.0,
+        }
+
+    # Codes whose every attempt was replaced have no counted grades; their
+    # mean and std are NaN
+    def course_summary(self) -> pd.DataFrame:
+        self.flush()
+        return pd.DataFrame(
+            [
+                (code, int(s.grades.n), *s.grades.describe(), s.attempts, s.replaced,
+                 s.replaced / s.attempts if s.attempts else 0.0)
+                for code, s in self.courses.items()
+            ],
+            columns=["Course Code", "Count", "Mean Grade", "Std Grade", "Attempts", "Replaced", "Replacement Rate"],
+        ).sort_values("Course Code", ignore_index=True)
+
+    def major_gpa(self) -> pd.DataFrame:
+        self.flush()
+        return pd.DataFrame(
+            [(major, m.n, round(m.mean, 4), round(m.std(), 4)) for major, m in self.majors.items()],
+            columns=["Major", "Weight", "Mean GPA", "Std GPA"],
+        ).sort_values("Major", ignore_index=True)
+
+    def stats(self) -> dict[str, int]:
+        self.flush()
+        return {
+            "transcripts": len(self.transcripts),
+            "rows": sum(int(s.grades.n) for s in self.courses.values()),
+            "segments": len(self.segments),
+            "courses": len(self.courses),
+        }
+
+    # Serializes writers across processes sharing the directory. The lock
+    # modules are platform-specific, so they are imported only when writing.
+    @contextmanager
+    def _directory_lock(self) -> Iterator[None]:
+        with open(self.directory / "lock", "a+b") as f:
+            if os.name == "nt":
+                import msvcrt
+                # Locks the first byte; retries for about 10 seconds, then raises OSError
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # Reloads state.pkl if another process (or a failed flush) left it
+    # different from what is in memory. The file is only ever replaced, so
+    # its inode and mtime identify a version; () stands for no file yet.
+    def _refresh(self) -> None:
+        path = self.directory / "state.pkl"
+        try:
+            stat = os.stat(path)
+            version = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            version = ()
+        if version == self._version:
+            return
+        if version:
+            with open(path, "rb") as f:
+                self._load_state(pickle.load(f))
+        else:
+            self._load_state({})
+        self._version = version
+
+    def _load_state(self, state: dict) -> None:
+        self.segments: list[str] = state.get("segments", [])
+        self.transcripts: set[str] = state.get("transcripts", set())
+        self.courses: dict[str, CourseStats] = state.get("courses", {})
+        self.majors: dict[str, Moments] = state.get("majors", {})
+        self.index: dict[str, list[tuple[str, int, int]]] = state.get("index", {})
+        self._version = None
+        for name in set(self._tables) - set(self.segments):
+            del self._tables[name]
+
+    # Written after the segment it refers to, so a crash between the two
+    # leaves an orphaned segment file rather than an index into nothing
+    def _write_state(self) -> None:
+        state = {
+            "segments": self.segments,
+            "transcripts": self.transcripts,
+            "courses": self.courses,
+            "majors": self.majors,
+            "index": self.index,
+        }
+        path = self.directory / "state.pkl"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        stat = os.stat(path)
+        self._version = (stat.st_ino, stat.st_mtime_ns)
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from copy import copy
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from lazyimport import lazy_import
+from transcriptreader import TranscriptReader
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+if TYPE_CHECKING:
+    from numpy.typing import ArrayLike
+
+
+# Running sums behind get_average / get_gpa. Full credit courses are
+# weighted twice, matching how the institution readers count them.
+@dataclass
+class Totals:
+    count: int = 0
+    full_credit: int = 0
+    grade_sum: float = 0.0
+    adj_grade_sum: float = 0.0
+    credit_sum: float = 0.0
+    gpa_points: int = 0
+    gpa_weight: int = 0
+
+    def add(self, grade: float, credits: float, gpa: float, sign: int = 1) -> None:
+        weight = 2 if credits == 1 else 1
+        self.count += sign
+        self.full_credit += sign * (weight - 1)
+        self.grade_sum += sign * grade
+        self.adj_grade_sum += sign * grade * weight
+        self.credit_sum += sign * credits
+        self.gpa_points += sign * round(gpa * 1000) * weight
+        self.gpa_weight += sign * weight
+
+    def average(self) -> float:
+        if not self.count:
+            return float("nan")
+        if self.full_credit:
+            return round(self.adj_grade_sum / (self.credit_sum * 2), 4)
+        return round(self.grade_sum / self.count, 2)
+
+    def gpa(self) -> float:
+        return TranscriptReader.round_gpa(self.gpa_points, self.gpa_weight)
+
+    def credits(self) -> float:
+        return self.credit_sum
+
+
+@dataclass
+class Forecast:
+    totals: Totals
+    replaced: list[str] = field(default_factory=list)
+    added: list[str] = field(default_factory=list)
+    removed_rows: list[int] = field(default_factory=list)
+
+
+# The transcript with a forecast applied: replaced rows dropped and the
+# planned courses appended as "Simulation n" rows
+def forecast_frame(
+        df: pd.DataFrame,
+        forecast: Forecast,
+        courses: list[str],
+        credits: list[float],
+        grades: list[float],
+        institution_class: TranscriptReader,
+    ) -> pd.DataFrame:
+
+    classes = [
+        {
+            "Course": course,
+            "Grade": grade,
+            "Credits": credit,
+            "Course Code": f"Simulation {i+1}",
+        }
+        for i, (course, grade, credit) in enumerate(zip(courses, grades, credits), 0)
+    ]
+
+    sim_df = pd.concat([df, pd.DataFrame(classes)], ignore_index=True)
+    sim_df = sim_df.drop(index=forecast.removed_rows)
+    # where() rather than .loc so an empty transcript's all-NaN column can take strings
+    sim_df["Course Name"] = sim_df["Course Name"].where(sim_df["Course Name"].notna(), sim_df["Course"])
+    sim_df["GPA"] = TranscriptReader.gpa_conversion(institution_class.scale(), sim_df["Grade"])
+    return sim_df.drop(columns=["Letter Grade", "Course"])
+
+
+# Indexes a transcript by course name and code so what-if changes only touch
+# the affected rows: evaluating or applying k course changes costs O(k).
+class ForecastEngine:
+
+    def __init__(self, df: pd.DataFrame, institution_class: TranscriptReader) -> None:
+        self.scale = institution_class.scale()
+        self.names = df["Course Name"].tolist()
+        self.codes = df["Course Code"].tolist()
+        self.grades = df["Grade"].tolist()
+        self.credits = df["Credits"].tolist()
+        self.gpas = TranscriptReader.gpa_conversion(self.scale, df["Grade"].to_numpy()).tolist()
+        self.active = [True] * len(self.names)
+
+        self.by_name, self.by_code = defaultdict(list), defaultdict(list)
+        for row, (name, code) in enumerate(zip(self.names, self.codes)):
+            self.by_name[name].append(row)
+            self.by_code[code].append(row)
+
+        credits = df["Credits"].to_numpy()
+        grades = df["Grade"].to_numpy(dtype=np.float64)
+        weights = np.where(credits == 1, 2, 1)
+        self.totals = Totals(
+            count=len(grades),
+            full_credit=int((weights == 2).sum()),
+            grade_sum=float(grades.sum()),
+            adj_grade_sum=float((grades * weights).sum()),
+            credit_sum=float(credits.sum()),
+            gpa_points=int((TranscriptReader.gpa_points(self.gpas) * weights).sum()),
+            gpa_weight=int(weights.sum()),
+        )
+
+    def rows(self, course: str) -> list[int]:
+        rows = self.by_name.get(course) or self.by_code.get(course) or []
+        return [row for row in rows if self.active[row]]
+
+    # Totals once every transcript row matching a planned course is dropped
+    def without(self, courses: list[str]) -> Totals:
+        totals, removed = copy(self.totals), set()
+        for course in courses:
+            for row in self.rows(course):
+                if row not in removed:
+                    removed.add(row)
+                    totals.add(self.grades[row], self.credits[row], self.gpas[row], -1)
+        return totals
+
+    def evaluate(
+            self,
+            courses: list[str],
+            credits: list[float],
+            grades: list[float],
+        ) -> Forecast:
+
+        forecast = Forecast(copy(self.totals))
+        removed = set()
+        gpas = TranscriptReader.gpa_conversion(self.scale, grades) if grades else []
+
+        for course, credit, grade, gpa in zip(courses, credits, grades, gpas):
+            rows = self.rows(course)
+            if rows:
+                forecast.replaced.append(course)
+                for row in rows:
+                    if row not in removed:
+                        removed.add(row)
+                        forecast.totals.add(self.grades[row], self.credits[row], self.gpas[row], -1)
+            else:
+                forecast.added.append(course)
+            forecast.totals.add(grade, credit, float(gpa))
+
+        forecast.removed_rows = sorted(removed)
+        return forecast
+
+    def add(self, course: str, grade: float, credits: float, code: str | None = None) -> int:
+        row = len(self.names)
+        gpa = float(TranscriptReader.gpa_conversion(self.scale, [grade])[0])
+        self.names.append(course)
+        self.codes.append(code)
+        self.grades.append(grade)
+        self.credits.append(credits)
+        self.gpas.append(gpa)
+        self.active.append(True)
+        self.by_name[course].append(row)
+        if code is not None:
+            self.by_code[code].append(row)
+        self.totals.add(grade, credits, gpa)
+        return row
+
+    def remove(self, course: str) -> list[int]:
+        rows = self.rows(course)
+        for row in rows:
+            self.active[row] = False
+            self.totals.add(self.grades[row], self.credits[row], self.gpas[row], -1)
+        return rows
+
+    def replace(self, course: str, grade: float, credits: float) -> int:
+        self.remove(course)
+        return self.add(course, grade, credits)
+
+
+@dataclass
+class Outcomes:
+    gpas: np.ndarray
+    percentiles: dict[float, float]
+    probabilities: dict[float, float]
+
+
+# GPA for a batch of scenarios: row s of `grades` holds the anticipated grade
+# of every planned course in scenario s.
+def scenario_gpas(
+        engine: ForecastEngine,
+        courses: list[str],
+        credits: list[float],
+        grades: ArrayLike,
+    ) -> np.ndarray:
+
+    base = engine.without(courses)
+    grades = np.atleast_2d(grades)
+    weights = np.where(np.asarray(credits) == 1, 2, 1)
+    points = TranscriptReader.gpa_points(TranscriptReader.gpa_conversion(engine.scale, grades)) @ weights
+    return TranscriptReader.round_gpa(base.gpa_points + points, int(base.gpa_weight + weights.sum()))
+
+
+# Minimum grade needed to reach `target`. Without anticipated grades the same
+# grade is required in every planned course; otherwise each course is solved
+# with the others held at their anticipated grade. None means unreachable.
+def required_grades(
+        engine: ForecastEngine,
+        courses: list[str],
+        credits: list[float],
+        target: float,
+        grades: list[float] | None = None,
+    ) -> list[int | None]:
+
+    k, grid = len(courses), np.arange(101)
+    if grades is None:
+        scenarios = np.repeat(grid[:, None], k, axis=1)
+        reached = scenario_gpas(engine, courses, credits, scenarios) >= target
+        return [int(grid[reached.argmax()]) if reached.any() else None] * k
+
+    # k blocks of 101 scenarios, block i sweeping course i over 0-100
+    scenarios = np.tile(np.asarray(grades), (k * grid.size, 1))
+    for i in range(k):
+        scenarios[i * grid.size:(i + 1) * grid.size, i] = grid
+    reached = (scenario_gpas(engine, courses, credits, scenarios) >= target).reshape(k, grid.size)
+    return [int(grid[r.argmax()]) if r.any() else None for r in reached]
+
+
+# Monte Carlo sweep: grades are drawn around the anticipated grades with the
+# given spread (standard deviation, in percentage points) and clipped to 0-100.
+def simulate_outcomes(
+        engine: ForecastEngine,
+        courses: list[str],
+        credits: list[float],
+        grades: list[float],
+        spread: float | ArrayLike = 5.0,
+        scenarios: int = 10000,
+        thresholds: tuple[float, ...] = (),
+        percentiles: tuple[float, ...] = (5, 25, 50, 75, 95),
+        seed: int | None = None,
+    ) -> Outcomes:
+
+    rng = np.random.default_rng(seed)
+    samples = rng.normal(grades, spread, size=(scenarios, len(courses)))
+    samples = np.clip(np.rint(samples), 0, 100).astype(np.int64)
+    gpas = scenario_gpas(engine, courses, credits, samples)
+
+    return Outcomes(
+        gpas=gpas,
+        percentiles=dict(zip(percentiles, np.percentile(gpas, percentiles).round(2).tolist())),
+        probabilities={t: float((gpas >= t).mean()) for t in thresholds},
+    )
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Sized
+from typing import Any
+
+from lazyimport import lazy_import
+
+pd = lazy_import("pandas")
+
+
+logger = logging.getLogger("transcript.stages")
+
+# tracemalloc is process-wide: tracing is started once and left on, and only
+# one stage at a time holds the peak. A traced stage records no peak if any
+# other profiled stage was in progress at any point while it ran.
+_memory_lock = threading.Lock()
+_memory_active = 0
+_memory_held = False
+_memory_overlapped = False
+
+
+def row_count(value: Any) -> int | None:
+    if isinstance(value, Sized) and not isinstance(value, (str, bytes, dict)):
+        return len(value)
+    return None
+
+
+# Records wall time, thread CPU time, peak traced allocation and row counts
+# for each stage run through it. When disabled, run() is a plain call.
+class StageProfiler:
+
+    def __init__(self, enabled: bool = False, memory: bool = True, context: dict | None = None) -> None:
+        self.enabled = enabled
+        self.memory = memory
+        self.context = context or {}
+        self.records: list[dict] = []
+
+    def run(self, stage: str, fn: Callable, *args, **kwargs) -> Any:
+        if not self.enabled:
+            return fn(*args, **kwargs)
+
+        traced, baseline = _begin_stage(self.memory)
+        try:
+            wall, cpu = time.perf_counter(), time.thread_time()
+            result = fn(*args, **kwargs)
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+        finally:
+            peak = _end_stage(traced, baseline)
+
+        self.records.append({
+            **self.context,
+            "stage": stage,
+            "wall_ms": round(wall * 1000, 3),
+            "cpu_ms": round(cpu * 1000, 3),
+            "peak_kib": round(peak / 1024, 1) if peak is not None else None,
+            "rows_in": row_count(args[0]) if args else None,
+            "rows_out": row_count(result),
+        })
+        return result
+
+    def table(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=[
+            *self.context, "stage", "wall_ms", "cpu_ms", "peak_kib", "rows_in", "rows_out",
+        ])
+
+    def emit(self) -> None:
+        emit(self.records)
+
+
+# Returns whether this stage holds the peak, and its starting traced size
+def _begin_stage(memory: bool) -> tuple[bool, int]:
+    global _memory_active, _memory_held, _memory_overlapped
+    with _memory_lock:
+        _memory_active += 1
+        if _memory_held:
+            _memory_overlapped = True
+        if not memory or _memory_held:
+            return False, 0
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _memory_held, _memory_overlapped = True, _memory_active > 1
+        tracemalloc.reset_peak()
+        return True, tracemalloc.get_traced_memory()[0]
+
+
+def _end_stage(traced: bool, baseline: int) -> int | None:
+    global _memory_active, _memory_held
+    with _memory_lock:
+        _memory_active -= 1
+        if not traced:
+            return None
+        _memory_held = False
+        if _memory_overlapped:
+            return None
+        return tracemalloc.get_traced_memory()[1] - baseline
+
+
+# One JSON object per stage, for log aggregation in headless runs
+def emit(records: list[dict]) -> None:
+    for record in records:
+        logger.info(json.dumps(record))
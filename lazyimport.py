@@ -0,0 +1,18 @@
+import importlib
+from types import ModuleType
+
+
+# Stand-in for a module that performs the real import on first attribute
+# access, so heavy dependencies only load once a code path uses them.
+# Annotations referencing a lazy module must stay unevaluated
+# (``from __future__ import annotations``).
+class LazyModule(ModuleType):
+
+    def __getattr__(self, attr: str):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    return LazyModule(name)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from instrumentation import StageProfiler
+from transcriptreader import TranscriptReader
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+ParseResult = tuple[list[str], "pd.DataFrame", "pd.DataFrame"]
+
+
+# The uncached pipeline; module-level so it can run in a process pool
+def parse_bytes(
+        data: bytes,
+        institution_class: TranscriptReader,
+        policy: str = "highest",
+        profiler: StageProfiler | None = None,
+    ) -> ParseResult:
+
+    run = (profiler or StageProfiler()).run
+    content = run("validate_pdf", institution_class.validate_pdf, io.BytesIO(data))
+    df_all_courses = run("parse_courses", institution_class.parse_courses, content)
+    df_gpa_courses = run("remove_replacements", institution_class.remove_replacements, df_all_courses, policy)
+    return content, df_all_courses, df_gpa_courses
+
+
+# Start method for parse worker pools: a forkserver where the platform has
+# one, since forking a threaded server process could copy a lock held by
+# another thread into the worker; otherwise the default (spawn on Windows)
+def pool_context() -> multiprocessing.context.BaseContext:
+    return multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None)
+
+
+# Content-addressed store for parsed transcripts. Entries are keyed by the
+# SHA-256 of the uploaded bytes, the institution, its parser version and the
+# replacement policy, so a parser change never serves stale results.
+class ParseCache:
+
+    def __init__(self, max_entries: int = 64, directory: str | None = None) -> None:
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits, self.disk_hits, self.misses = 0, 0, 0
+        self._entries: OrderedDict[str, ParseResult] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, data: bytes, institution_class: TranscriptReader, policy: str = "highest") -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        return f"{institution_class.__name__}-{institution_class.parser_version()}-{policy}-{digest}"
+
+    def get(self, key: str) -> ParseResult | None:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._copy(self._entries[key])
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, result)
+        return self._copy(result)
+
+    def put(self, key: str, result: ParseResult) -> None:
+        result = self._copy(result)
+        with self._lock:
+            self._store(key, result)
+        self._write_disk(key, result)
+
+    def parse(
+            self,
+            data: bytes,
+            institution_class: TranscriptReader,
+            profiler: StageProfiler | None = None,
+            policy: str = "highest",
+        ) -> ParseResult:
+
+        profiler = profiler or StageProfiler()
+        key = self.key(data, institution_class, policy)
+        result = profiler.run("cache_lookup", self.get, key)
+        if result is None:
+            result = parse_bytes(data, institution_class, policy, profiler)
+            self.put(key, result)
+        return result
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits, self.disk_hits, self.misses = 0, 0, 0
+
+    def _store(self, key: str, result: ParseResult) -> None:
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # Callers annotate the frames (e.g. get_gpa adds a "GPA" column),
+    # so cached entries are never handed out directly.
+    def _copy(self, result: ParseResult) -> ParseResult:
+        content, df_all_courses, df_gpa_courses = result
+        return list(content), df_all_courses.copy(), df_gpa_courses.copy()
+
+    def _read_disk(self, key: str) -> ParseResult | None:
+        if self.directory is None:
+            return None
+        path = self.directory / f"{key}.pkl"
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_disk(self, key: str, result: ParseResult) -> None:
+        if self.directory is None:
+            return
+        path = self.directory / f"{key}.pkl"
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY,
+    transcript TEXT NOT NULL,
+    name TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS scenarios_transcript_name ON scenarios (transcript, name);
+DROP INDEX IF EXISTS scenarios_name;
+CREATE TABLE IF NOT EXISTS results (
+    scenario INTEGER NOT NULL REFERENCES scenarios (id) ON DELETE CASCADE,
+    parser TEXT NOT NULL,
+    result BLOB NOT NULL,
+    PRIMARY KEY (scenario, parser)
+);
+"""
+
+
+# Saved forecast inputs per transcript (keyed by content hash) in a local
+# SQLite file, with each scenario's computed result cached per parser
+# (institution, parser version, replacement policy and result format), so a
+# reload does not recompute. Saving a scenario again drops its cached results.
+class ScenarioStore:
+
+    def __init__(self, path: str) -> None:
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def save(self, transcript: str, name: str, inputs: dict[str, Any]) -> int:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO scenarios (transcript, name, inputs, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (transcript, name) DO UPDATE SET inputs = excluded.inputs, updated = excluded.updated",
+                (transcript, name, json.dumps(inputs), time.time()),
+            )
+            scenario = self._conn.execute(
+                "SELECT id FROM scenarios WHERE transcript = ? AND name = ?", (transcript, name)
+            ).fetchone()[0]
+            self._conn.execute("DELETE FROM results WHERE scenario = ?", (scenario,))
+        return scenario
+
+    def names(self, transcript: str) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM scenarios WHERE transcript = ? ORDER BY updated DESC", (transcript,)
+            ).fetchall()
+        return [name for name, in rows]
+
+    def load(self, transcript: str, name: str) -> tuple[int, dict[str, Any]] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, inputs FROM scenarios WHERE transcript = ? AND name = ?", (transcript, name)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def delete(self, transcript: str, name: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM scenarios WHERE transcript = ? AND name = ?", (transcript, name))
+
+    def result(self, scenario: int, parser: str) -> Any | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM results WHERE scenario = ? AND parser = ?", (scenario, parser)
+            ).fetchone()
+        if row is None:
+            return None
+        # A result that no longer unpickles (e.g. after an upgrade) is a miss
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            return None
+
+    def put_result(self, scenario: int, parser: str, result: Any) -> None:
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (scenario, parser, result) VALUES (?, ?, ?)",
+                (scenario, parser, blob),
+            )
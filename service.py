@@ -0,0 +1,303 @@
+import argparse
+import asyncio
+import io
+import json
+import logging
+import math
+import os
+import sys
+import time
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+import pandas as pd
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from forecast import ForecastEngine, forecast_frame
+from parsecache import ParseCache, ParseResult, parse_bytes, pool_context
+from transcriptreader import INSTITUTIONS, REPLACEMENT_POLICIES, TranscriptReader, detect_institution
+
+
+logger = logging.getLogger("transcript.service")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Cumulative latency buckets per route, rendered in the Prometheus text format
+class LatencyHistogram:
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts: dict[tuple[str, int], list[int]] = {}
+        self.sums: dict[tuple[str, int], float] = {}
+
+    def observe(self, route: str, status: int, seconds: float) -> None:
+        counts = self.counts.setdefault((route, status), [0] * (len(self.buckets) + 1))
+        counts[bisect_left(self.buckets, seconds)] += 1
+        self.sums[(route, status)] = self.sums.get((route, status), 0.0) + seconds
+
+    def render(self, name: str) -> list[str]:
+        lines = [f"# TYPE {name} histogram"]
+        for (route, status), counts in sorted(self.counts.items()):
+            labels = f'route="{route}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {self.sums[(route, status)]:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+def records(df: pd.DataFrame) -> list[dict]:
+    return json.loads(df.to_json(orient="records"))
+
+
+# JSON has no NaN; a transcript with no graded courses has no GPA or average
+def finite(value: float) -> float | None:
+    return None if math.isnan(value) else value
+
+
+def summary(df_gpa_courses: pd.DataFrame, institution_class: TranscriptReader) -> dict:
+    return {
+        "gpa": finite(institution_class.get_gpa(df_gpa_courses)),
+        "average": finite(institution_class.get_average(df_gpa_courses)),
+        "credits": float(df_gpa_courses["Credits"].sum()),
+    }
+
+
+# The same limits as the app's form; whole grades stay ints, like parsed ones
+def planned_course(course: dict) -> tuple[str, int | float, float]:
+    if isinstance(course["grade"], bool):
+        raise TypeError("grade must be a number")
+    grade, credits = float(course["grade"]), float(course.get("credits", 0.5))
+    if not (0 <= grade <= 100) or credits not in (0.5, 1.0):
+        raise ValueError("grade or credits out of range")
+    return str(course["course"]).strip(), int(grade) if grade.is_integer() else grade, credits
+
+
+def run_forecast(df_gpa_courses: pd.DataFrame, institution_class: TranscriptReader,
+                 courses: list[str], credits: list[float], grades: list[float]):
+    engine = ForecastEngine(df_gpa_courses, institution_class)
+    forecast = engine.evaluate(courses, credits, grades)
+    sim_df = forecast_frame(df_gpa_courses, forecast, courses, credits, grades, institution_class)
+    return engine.totals, forecast, sim_df
+
+
+# Cache keys start with the parser class name
+def institution_of(key: str) -> str | None:
+    class_name = key.split("-", 1)[0]
+    return next((name for name, cls in INSTITUTIONS.items() if cls.__name__ == class_name), None)
+
+
+# Parsed transcripts are kept in a ParseCache and addressed by its
+# content-hash key. Cache reads and writes (pickles on disk with
+# TRANSCRIPT_CACHE_DIR) and response building run in threads, off the event
+# loop. The parser is picked from the first page alone. Parsing
+# runs in a process pool; once `workers + queue_limit` uploads are in flight,
+# further uploads are refused with a 429 instead of queueing without bound.
+class TranscriptService:
+
+    def __init__(
+            self,
+            workers: int | None = None,
+            queue_limit: int | None = None,
+            cache: ParseCache | None = None,
+        ) -> None:
+
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + (queue_limit if queue_limit is not None else self.workers * 2)
+        self.cache = cache or ParseCache()
+        self.pool: ProcessPoolExecutor | None = None
+        self.in_flight, self.rejected = 0, 0
+        # Ids handed out by this process, to tell an evicted transcript from an unknown one
+        self.issued: set[str] = set()
+        self.latency = LatencyHistogram()
+
+    @asynccontextmanager
+    async def lifespan(self, app: Starlette):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context())
+        try:
+            yield
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+
+    def app(self) -> Starlette:
+        routes = [
+            Route("/transcripts", self.timed("/transcripts", self.upload), methods=["POST"]),
+            Route("/transcripts/{transcript_id}", self.timed("/transcripts/{id}", self.transcript), methods=["GET"]),
+            Route("/transcripts/{transcript_id}/forecast", self.timed("/transcripts/{id}/forecast", self.forecast),
+                  methods=["POST"]),
+            Route("/metrics", self.metrics, methods=["GET"]),
+        ]
+        return Starlette(routes=routes, lifespan=self.lifespan)
+
+    def timed(self, route: str, endpoint):
+        async def handler(request: Request) -> Response:
+            start, status = time.perf_counter(), 500
+            try:
+                response = await endpoint(request)
+                status = response.status_code
+                return response
+            except Exception as e:
+                logger.exception("%s %s failed", request.method, route)
+                return JSONResponse({"error": f"Internal error: {type(e).__name__}"}, status_code=500)
+            finally:
+                self.latency.observe(route, status, time.perf_counter() - start)
+        return handler
+
+    async def upload(self, request: Request) -> Response:
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            return JSONResponse({"error": "Parser queue is full, retry later."}, status_code=429,
+                                headers={"Retry-After": "1"})
+
+        policy = request.query_params.get("policy", "highest")
+        if policy not in REPLACEMENT_POLICIES:
+            return JSONResponse({"error": f"policy must be one of {', '.join(REPLACEMENT_POLICIES)}."}, status_code=400)
+
+        self.in_flight += 1
+        try:
+            data = await self.read_pdf(request)
+            if not data:
+                return JSONResponse({"error": "Expected a PDF as the request body or a 'file' form field."},
+                                    status_code=400)
+
+            try:
+                institution = await asyncio.to_thread(detect_institution, io.BytesIO(data))
+            except ValueError as e:
+                return JSONResponse({"error": f"Transcript Read Error: {e}"}, status_code=422)
+            if institution is None:
+                return JSONResponse({"error": "Transcript Read Error: not a transcript from a supported institution."},
+                                    status_code=422)
+
+            key = self.cache.key(data, INSTITUTIONS[institution], policy)
+            result = await asyncio.to_thread(self.cache.get, key)
+            if result is None:
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        self.pool, parse_bytes, data, INSTITUTIONS[institution], policy
+                    )
+                except Exception as e:
+                    return JSONResponse({"error": f"Transcript Read Error: {type(e).__name__}: {e}"},
+                                        status_code=422)
+                await asyncio.to_thread(self.cache.put, key, result)
+            self.issued.add(key)
+        finally:
+            self.in_flight -= 1
+
+        return JSONResponse(await asyncio.to_thread(self.describe, key, result))
+
+    async def read_pdf(self, request: Request) -> bytes:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            async with request.form() as form:
+                upload = form.get("file")
+                return await upload.read() if upload is not None and not isinstance(upload, str) else b""
+        return await request.body()
+
+    async def transcript(self, request: Request) -> Response:
+        key = request.path_params["transcript_id"]
+        result = await asyncio.to_thread(self.cache.get, key) if institution_of(key) else None
+        if result is None:
+            return self.missing(key)
+        return JSONResponse(await asyncio.to_thread(self.describe, key, result))
+
+    # Parsed transcripts live only in the cache, so older ones are evicted
+    def missing(self, key: str) -> Response:
+        if key in self.issued:
+            return JSONResponse({"error": f"Transcript {key} is no longer cached; re-upload it."}, status_code=410)
+        return JSONResponse({"error": f"Unknown transcript id {key}."}, status_code=404)
+
+    def describe(self, key: str, result: ParseResult) -> dict:
+        _, df_all_courses, df_gpa_courses = result
+        institution = institution_of(key)
+        return {
+            "id": key,
+            "institution": institution,
+            **summary(df_gpa_courses, INSTITUTIONS[institution]),
+            "courses": records(df_gpa_courses),
+            "all_courses": records(df_all_courses),
+        }
+
+    # Body: {"courses": [{"course": "Course Name or Code", "grade": 85, "credits": 0.5}, ...]}
+    async def forecast(self, request: Request) -> Response:
+        key = request.path_params["transcript_id"]
+        institution = institution_of(key)
+        result = await asyncio.to_thread(self.cache.get, key) if institution else None
+        if result is None:
+            return self.missing(key)
+
+        try:
+            planned = (await request.json())["courses"]
+            courses, grades, credits = zip(*map(planned_course, planned)) if planned else ([], [], [])
+        except (ValueError, KeyError, TypeError):
+            return JSONResponse({"error": "Expected {\"courses\": [{\"course\", \"grade\", \"credits\"}, ...]} "
+                                          "with grades from 0 to 100 and credits of 0.5 or 1.0."},
+                                status_code=400)
+        if not courses:
+            return JSONResponse({"error": "Expected at least one planned course."}, status_code=400)
+
+        _, _, df_gpa_courses = result
+        base, forecast, sim_df = await asyncio.to_thread(
+            run_forecast, df_gpa_courses, INSTITUTIONS[institution], list(courses), list(credits), list(grades)
+        )
+        sim = forecast.totals
+        return JSONResponse({
+            "id": key,
+            "replaced": forecast.replaced,
+            "added": forecast.added,
+            "gpa": finite(sim.gpa()),
+            "average": finite(sim.average()),
+            "credits": sim.credits(),
+            "delta": {
+                "gpa": finite(round(sim.gpa() - base.gpa(), 4)),
+                "average": finite(round(sim.average() - base.average(), 4)),
+                "credits": sim.credits() - base.credits(),
+            },
+            "courses": records(sim_df),
+        })
+
+    async def metrics(self, request: Request) -> Response:
+        stats = self.cache.stats()
+        lines = self.latency.render("transcript_request_duration_seconds")
+        lines += [
+            "# TYPE transcript_parse_in_flight gauge",
+            f"transcript_parse_in_flight {self.in_flight}",
+            "# TYPE transcript_parse_capacity gauge",
+            f"transcript_parse_capacity {self.capacity}",
+            "# TYPE transcript_parse_rejected_total counter",
+            f"transcript_parse_rejected_total {self.rejected}",
+            "# TYPE transcript_cache_hits_total counter",
+            f"transcript_cache_hits_total {stats['hits'] + stats['disk_hits']}",
+            "# TYPE transcript_cache_misses_total counter",
+            f"transcript_cache_misses_total {stats['misses']}",
+        ]
+        return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the transcript parsers and forecaster over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: loopback only)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Parser worker processes (default: number of CPUs)")
+    parser.add_argument("--queue-limit", type=int, default=None,
+                        help="Uploads allowed to wait for a worker before returning 429 (default: 2x workers)")
+    args = parser.parse_args(argv)
+
+    cache = ParseCache(
+        max_entries=int(os.environ.get("TRANSCRIPT_CACHE_SIZE", 64)),
+        directory=os.environ.get("TRANSCRIPT_CACHE_DIR"),
+    )
+    service = TranscriptService(args.workers, args.queue_limit, cache)
+    uvicorn.run(service.app(), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
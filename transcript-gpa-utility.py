@@ -1,22 +1,86 @@
+from __future__ import annotations
+import atexit
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import streamlit as st
-import plotly.express as px
-import pandas as pd
-import numpy as np
-from transcriptreader import TranscriptReader
-from transcriptreader import TrentUniversity
+from collections.abc import Callable
+from lazyimport import lazy_import
+from cohortstore import CohortStore, cohort_directory
+from forecast import Forecast, ForecastEngine, Totals, forecast_frame, required_grades, simulate_outcomes
+from instrumentation import StageProfiler
+from parsecache import ParseCache, parse_bytes, pool_context
+from scenariostore import ScenarioStore
+from transcriptreader import GRADE_BIN_LABELS, INSTITUTIONS, REPLACEMENT_POLICIES, TranscriptReader
+from transcriptreader import detect_institution, grade_histogram
+
+# Deferred until a transcript is shown, so the institution selector renders
+# without loading the data and charting stack
+px = lazy_import("plotly.express")
+pd = lazy_import("pandas")
+
+POLICY_LABELS = {
+    "highest": "Highest grade",
+    "recent": "Most recent attempt",
+    "marker": "Attempt marked R",
+}
+
+
+@st.cache_resource
+def get_parse_cache() -> ParseCache:
+    return ParseCache(
+        max_entries=int(os.environ.get("TRANSCRIPT_CACHE_SIZE", 64)),
+        directory=os.environ.get("TRANSCRIPT_CACHE_DIR"),
+    )
 
 
-def plot(df: pd.DataFrame, chart_id: str = "null") -> None:
-    X, title = (
-        ("sim", "#### Forecast Summary")
-        if chart_id=="sim"
-        else ("no_sim", "#### Courses Counted Toward GPA")
-    )
-    st.markdown(
-        title, help="Hover over any scatter point to display course information"
+@st.cache_resource
+def get_parse_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=int(os.environ.get("TRANSCRIPT_PARSE_WORKERS", os.cpu_count() or 1)),
+        mp_context=pool_context(),
     )
+
+
+# Opt-in like the other local stores: scenarios are only saved when
+# TRANSCRIPT_SCENARIO_DB names a SQLite file
+@st.cache_resource
+def get_scenario_store() -> ScenarioStore | None:
+    path = os.environ.get("TRANSCRIPT_SCENARIO_DB")
+    return ScenarioStore(path) if path else None
+
+
+# Reads only the first page; the parser is picked before any full parse
+@st.cache_data(max_entries=64, show_spinner=False)
+def detect_upload(data: bytes) -> str | None:
+    return detect_institution(io.BytesIO(data))
+
+
+# Opt-in: uploaded transcripts are only kept for cohort analytics when
+# TRANSCRIPT_COHORT_DIR is set. Uploads are buffered and written at most once
+# a minute (and on exit) rather than as one segment per transcript.
+@st.cache_resource
+def get_cohort_store(_institution_class: TranscriptReader, institution: str) -> CohortStore | None:
+    root = os.environ.get("TRANSCRIPT_COHORT_DIR")
+    if not root:
+        return None
+    store = CohortStore(cohort_directory(root, _institution_class), _institution_class, flush_after=60.0)
+    atexit.register(store.flush)
+    return store
+
+
+# Identifies the chart data so unchanged figures are served from cache
+def fingerprint(df: pd.DataFrame, columns: list[str]) -> str:
+    hashed = pd.util.hash_pandas_object(df[columns], index=True).to_numpy()
+    return hashlib.blake2b(hashed.tobytes(), digest_size=16).hexdigest()
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def scatter_figure(_df: pd.DataFrame, data_key: str, X: str, x_max: float):
     fig = px.scatter(
-        df,
+        _df,
         x=X,
         y="Grade",
         hover_name="Course Name",
@@ -25,13 +89,43 @@ def plot(df: pd.DataFrame, chart_id: str = "null") -> None:
     )
     fig.update_layout(
         height=550,
-        xaxis_range=[-1, len(df[X]) + (1 if X == "no_sim" else df["x_addition"][0])],
+        xaxis_range=[-1, x_max],
         yaxis_range=[-5, 105],
         yaxis_dtick=10,
         showlegend=False,
         xaxis=dict(showticklabels=False, ticks="", title=""),
     )
     fig.update_traces(marker=dict(size=8))
+    return fig
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def distribution_figure(_df: pd.DataFrame, data_key: str, institution_class: TranscriptReader):
+    counts = grade_histogram(_df["Grade"].to_numpy())
+    fig = px.bar(
+        pd.DataFrame({"Grade": GRADE_BIN_LABELS, "Count": counts}),
+        x="Grade",
+        y="Count",
+    )
+    fig.update_layout(
+    yaxis_range=[0, counts.max()],
+    yaxis_dtick=1,
+                )
+    fig.update_traces(marker_color='#00B0EE')
+    return institution_class.get_average(_df), fig
+
+
+def plot(df: pd.DataFrame, chart_id: str = "null") -> None:
+    X, title = (
+        ("sim", "#### Forecast Summary")
+        if chart_id=="sim"
+        else ("no_sim", "#### Courses Counted Toward GPA")
+    )
+    st.markdown(
+        title, help="Hover over any scatter point to display course information"
+    )
+    x_max = len(df[X]) + (1 if X == "no_sim" else df["x_addition"][0])
+    fig = scatter_figure(df, fingerprint(df, [X, "Grade", "Course Name"]), X, x_max)
     st.plotly_chart(fig, key=f"{chart_id}")
 
 
@@ -43,67 +137,124 @@ def plot_distribution(
 
     option = "GPA Weighted" if chart_id=="gpadist" else "GPA Forecasted" if chart_id=="simdist" else "Total"
     st.markdown(f"#### Distribution of {option} Course Grades")
-    st.markdown(f"Mean Grade: **{institution_class.get_average(df):.2f}**")
-
-    intervals, grade = np.linspace(-1e-10, 100, 21), df["Grade"]
-    dist = pd.cut(grade,
-                  bins=intervals,
-                  ).value_counts(
-                  ).sort_index(
-                  ).reset_index(
-                  ).astype(str)
-    dist.columns=["Grade", "Count"]
-
-    fig = px.bar(
-        dist,
-        x="Grade",
-        y="Count",
-    )
-    fig.update_layout(
-    yaxis_range=[0, dist.max()],
-    yaxis_dtick=1,
-                )
-    fig.update_traces(marker_color='#00B0EE')
+    average, fig = distribution_figure(df, fingerprint(df, ["Grade", "Credits"]), institution_class)
+    st.markdown(f"Mean Grade: **{average:.2f}**")
     st.plotly_chart(fig,
                     key=f"{chart_id}",
                 )
 
 
-def simulator(
+# Parses every upload in the process pool (cache hits skip it), reporting
+# progress as files finish. A file that fails only gets an error row.
+def compare_transcripts(files: list, policy: str) -> pd.DataFrame:
+    cache, rows, pending = get_parse_cache(), {}, {}
+    for file in files:
+        data = file.getvalue()
+        try:
+            institution = detect_upload(data)
+        except ValueError:
+            institution = None
+        if institution is None:
+            rows[file.file_id] = {"File": file.name, "Error": "Not a transcript from a supported institution."}
+            continue
+        institution_class = INSTITUTIONS[institution]
+        key = cache.key(data, institution_class, policy)
+        result = cache.get(key)
+        if result is None:
+            future = get_parse_pool().submit(parse_bytes, data, institution_class, policy)
+            pending[future] = (file, data, institution, key)
+        else:
+            try:
+                rows[file.file_id] = transcript_row(file, data, institution, result)
+            except Exception as e:
+                rows[file.file_id] = error_row(file, institution, e)
+
+    progress = st.progress(0.0, text=f"Parsing {len(files)} transcripts")
+    done = len(files) - len(pending)
+    progress.progress(done / len(files), text=f"Parsed {done} of {len(files)} transcripts")
+    for future in as_completed(pending):
+        file, data, institution, key = pending[future]
+        try:
+            result = future.result()
+            cache.put(key, result)
+            rows[file.file_id] = transcript_row(file, data, institution, result)
+        except Exception as e:
+            rows[file.file_id] = error_row(file, institution, e)
+        done += 1
+        progress.progress(done / len(files), text=f"Parsed {done} of {len(files)} transcripts")
+    progress.empty()
+
+    return pd.DataFrame(
+        [rows[file.file_id] for file in files],
+        columns=["File", "Institution", "GPA", "Average Grade", "Credits", "Courses", "Error"],
+    )
+
+
+# One file's failure is reported in its row rather than ending the comparison
+def error_row(file, institution: str, e: Exception) -> dict:
+    return {"File": file.name, "Institution": institution, "Error": f"{type(e).__name__}: {e}"}
+
+
+def transcript_row(file, data: bytes, institution: str, result: tuple) -> dict:
+    institution_class = INSTITUTIONS[institution]
+    _, df_all_courses, df_gpa_courses = result
+    cohort = get_cohort_store(institution_class, institution_class.__name__)
+    if cohort is not None:
+        cohort.append(hashlib.sha256(data).hexdigest(), df_all_courses, df_gpa_courses)
+    return {
+        "File": file.name,
+        "Institution": institution,
+        "GPA": institution_class.get_gpa(df_gpa_courses),
+        "Average Grade": institution_class.get_average(df_gpa_courses),
+        "Credits": float(df_gpa_courses["Credits"].sum()),
+        "Courses": len(df_gpa_courses),
+    }
+
+
+def show_table(heading: str, df: pd.DataFrame) -> None:
+    st.markdown(heading)
+    st.write(df)
+
+
+# Expander whose body only runs while it is open; opening it reruns the page
+def panel(label: str, key: str, render: Callable, *args) -> None:
+    expander = st.expander(label, key=f"panel_{key}", on_change="rerun")
+    if expander.open:
+        with expander:
+            render(*args)
+
+
+# Saved scenario results are pickled; bump this when ForecastResult or the
+# classes in it change shape so stale cached results are not loaded
+FORECAST_RESULT_FORMAT = 1
+ForecastResult = tuple["Totals", "Forecast", "pd.DataFrame"]
+
+
+def run_forecast(
     df: pd.DataFrame,
     courses: list[str],
     credits: list[float],
     grades: list[int],
     institution_class: TranscriptReader,
-    ) -> pd.DataFrame:
+    engine: ForecastEngine | None = None,
+    ) -> ForecastResult:
 
-    classes, remove, adding = [], [], []
-    for i, (course, grade, credit) in enumerate(zip(courses, grades, credits), 0):
-        row = {
-            "Course": course,
-            "Grade": grade,
-            "Credits": credit,
-            "Course Code": f"Simulation {i+1}",
-        }
-        classes.append(row) # Entered data as list of dict
-
-        if (df["Course Name"] == course).any(): # Check for course already on transcript
-            remove.append(course)
-        else:
-            adding.append(course)
-    
-    sim_df = pd.concat([df, pd.DataFrame(classes)], ignore_index=True)
+    engine = engine or ForecastEngine(df, institution_class)
+    forecast = engine.evaluate(courses, credits, grades)
 
+    sim_df = forecast_frame(df, forecast, courses, credits, grades, institution_class)
     sim_df["x_addition"] = 0
-    for i, c in enumerate(remove, 1):
-        sim_df = sim_df[sim_df["Course Name"] != c]
-        sim_df.loc[0, "x_addition"] = i
+    if forecast.replaced:
+        sim_df.iloc[0, sim_df.columns.get_loc("x_addition")] = len(forecast.replaced)
 
-    sim_df.loc[sim_df["Course Name"].isna(), "Course Name"] = sim_df["Course"]
+    return engine.totals, forecast, sim_df
 
+
+def show_forecast(base: Totals, forecast: Forecast) -> None:
+    remove, adding, sim = forecast.replaced, forecast.added, forecast.totals
     credits_difference, grd_difference = (
-        sim_df["Credits"].sum() - df["Credits"].sum(),
-        round(institution_class.get_average(sim_df) - institution_class.get_average(df), 4),
+        sim.credits() - base.credits(),
+        round(sim.average() - base.average(), 4),
     )
 
     st.markdown("## Forecast Summary")
@@ -114,22 +265,287 @@ def simulator(
     col1, col2, col3 = st.columns(3)
     with col1:
         st.metric("Forecasted Grade Point Average (GPA)",
-                  institution_class.get_gpa(sim_df), delta=round(institution_class.get_gpa(sim_df) - institution_class.get_gpa(df), 4),
+                  sim.gpa(), delta=round(sim.gpa() - base.gpa(), 4),
                   border=True
                 )
     with col2:
-        st.metric("Forecasted Average Grade", f"{institution_class.get_average(sim_df)}%",
+        st.metric("Forecasted Average Grade", f"{sim.average()}%",
                   delta=grd_difference,
                   border=True
                 )
     with col3:
         st.metric("Total Credits Upon Completion",
-                  sim_df['Credits'].sum(), delta=credits_difference,
+                  sim.credits(), delta=credits_difference,
                   border=True
                 )
     st.markdown("")
 
-    return sim_df.drop(columns=["Letter Grade", "Course"])
+
+def simulator(
+    df: pd.DataFrame,
+    courses: list[str],
+    credits: list[float],
+    grades: list[int],
+    institution_class: TranscriptReader,
+    engine: ForecastEngine | None = None,
+    ) -> pd.DataFrame:
+
+    base, forecast, sim_df = run_forecast(df, courses, credits, grades, institution_class, engine)
+    show_forecast(base, forecast)
+    return sim_df
+
+
+def target_outlook(
+    engine: ForecastEngine,
+    courses: list[str],
+    credits: list[float],
+    grades: list[int],
+    target: float,
+    spread: float,
+    ) -> None:
+
+    uniform = required_grades(engine, courses, credits, target)[0]
+    needed = required_grades(engine, courses, credits, target, grades)
+    outcomes = simulate_outcomes(engine, courses, credits, grades, spread,
+                                 thresholds=(target,), percentiles=(5, 50, 95))
+
+    st.markdown(f"#### Reaching a {target:.2f} GPA")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Minimum Grade in Every Course",
+                  f"{uniform}%" if uniform is not None else "Unreachable",
+                  border=True
+                )
+    with col2:
+        st.metric(f"Chance of Reaching {target:.2f}",
+                  f"{outcomes.probabilities[target]:.0%}",
+                  help=f"Share of {len(outcomes.gpas):,} simulated outcomes with grades varying by ±{spread:g} around the anticipated grades.",
+                  border=True
+                )
+    with col3:
+        low, median, high = outcomes.percentiles.values()
+        st.metric("Likely GPA Range", f"{low} – {high}",
+                  help=f"5th to 95th percentile of simulated outcomes (median {median}).",
+                  border=True
+                )
+    st.write(pd.DataFrame({
+        "Course Name": courses,
+        "Anticipated Grade": grades,
+        "Minimum Grade (others as anticipated)": [g if g is not None else "Unreachable" for g in needed],
+    }))
+
+
+# One engine per transcript per session; rebuilt only when the transcript changes
+def forecast_engine(transcript: dict) -> ForecastEngine:
+    cached = st.session_state.get("forecast_engine")
+    if cached is None or cached[0] != transcript["key"]:
+        cached = (transcript["key"], ForecastEngine(transcript["df_gpa_courses"], transcript["institution"]))
+        st.session_state.forecast_engine = cached
+    return cached[1]
+
+
+# Reruns on its own when the forecast inputs change, reading the parsed
+# transcript from session state instead of re-running the pipeline
+@st.fragment
+def forecasting() -> None:
+
+    transcript = st.session_state.transcript
+    institution_class, df_gpa_courses = transcript["institution"], transcript["df_gpa_courses"]
+    profiler = StageProfiler(
+        enabled=set_debug_mode or profile_stages,
+        context={"institution": institution_class.__name__, "stage_group": "forecast"},
+    )
+
+    if "num_courses" not in st.session_state:
+        st.session_state.num_courses = 1
+    if st.session_state.num_courses == 0:
+        st.session_state.num_courses = 1
+    st.session_state.setdefault("target_gpa", 3.7)
+    st.session_state.setdefault("grade_spread", 5)
+    def clear_all():
+        st.session_state.num_courses = 1
+        st.session_state["course_0"] = ""
+        st.session_state["grade_0"] = 0
+    def add_course():
+        st.session_state.num_courses += 1
+    def delete_course():
+        if st.session_state.num_courses > 1:
+            st.session_state.num_courses -= 1
+        else:
+            clear_all()
+
+    st.write("___")
+    st.markdown(
+        "## GPA Forecasting",
+        help="Course Name: The name or code of the course you are intending to add or replace (see the \"Course Name\" and \"Course Code\" columns in the data table).\n\nAnticipated Grade: The final grade you are expecting to receive for this course.\n\nCredits: O.5 for half credit \"H\" courses (1 semester), 1 for full credit \"Y\" courses (2 semesters).",
+    )
+    st.markdown("##### **Enter your course details below to forecast your GPA**")
+    st.write("")
+
+    store = get_scenario_store()
+    if store is not None:
+        def load_scenario():
+            name = st.session_state.get("scenario_pick")
+            loaded = store.load(transcript["digest"], name) if name else None
+            if loaded is None:
+                return
+            scenario, inputs = loaded
+            courses, credits, grades = inputs["courses"], inputs["credits"], inputs["grades"]
+            st.session_state.num_courses = max(len(courses), 1)
+            # Rows past the loaded ones would otherwise reappear when added
+            for key in list(st.session_state):
+                field, _, index = str(key).rpartition("_")
+                if field in ("course", "credit", "grade") and index.isdigit() and int(index) >= len(courses):
+                    del st.session_state[key]
+            for i, (course, credit, grade) in enumerate(zip(courses, credits, grades)):
+                st.session_state[f"course_{i}"] = course
+                st.session_state[f"credit_{i}"] = credit
+                st.session_state[f"grade_{i}"] = grade
+            st.session_state.target_gpa = inputs["target"]
+            st.session_state.grade_spread = inputs["spread"]
+            st.session_state.scenario_name = name
+            st.session_state.forecast = (transcript["key"], courses, credits, grades, scenario)
+        def delete_scenario():
+            name = st.session_state.get("scenario_pick")
+            if name:
+                store.delete(transcript["digest"], name)
+                forecast = st.session_state.get("forecast")
+                if forecast is not None and forecast[4] is not None and name == st.session_state.get("scenario_name"):
+                    st.session_state.forecast = (*forecast[:4], None)
+
+        names = store.names(transcript["digest"])
+        if names:
+            col1, col2, col3, _ = st.columns([4, 1, 1, 4], vertical_alignment="bottom")
+            with col1:
+                st.selectbox("Saved scenarios", names, key="scenario_pick")
+            with col2:
+                st.button("Load", on_click=load_scenario, width="stretch")
+            with col3:
+                st.button("Delete", on_click=delete_scenario, width="stretch")
+
+    st.button("**+**", on_click=add_course)
+    st.button("**–**", on_click=delete_course)
+
+    with st.form(key="row", border=True):
+        for i in range(st.session_state.num_courses):
+
+            header1, header2, header3 = (
+                ("Course Name", "Anticipated Grade", "Credits")
+                if i == 0
+                else ("Course Name", "Anticipated Grade", "Credits")
+            )
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.write("")
+                st.text_input(f"{header1}", key=f"course_{i}")
+            with col2:
+                st.write("")
+                st.number_input(
+                    f"{header2}",
+                    min_value=0,
+                    max_value=100,
+                    step=1,
+                    key=f"grade_{i}",
+                )
+            with col3:
+                st.write("")
+                st.number_input(
+                    f"{header3}",
+                    min_value=0.5,
+                    max_value=1.0,
+                    step=0.5,
+                    key=f"credit_{i}",
+                )
+            st.write("___")
+
+        col1, col2, _ = st.columns(3)
+        with col1:
+            st.number_input(
+                "Target GPA",
+                min_value=0.0,
+                max_value=4.0,
+                step=0.1,
+                key="target_gpa",
+            )
+        with col2:
+            st.number_input(
+                "Grade Uncertainty (±)",
+                min_value=0,
+                max_value=25,
+                step=1,
+                key="grade_spread",
+                help="How far your final grades could plausibly land from the anticipated grades.",
+            )
+
+        submit = st.form_submit_button("Forecast")
+
+    if submit:
+        courses, credits, grades = [], [], []
+
+        for i in range(st.session_state.num_courses):
+            course = st.session_state.get(f"course_{i}", "").strip()
+            grade = st.session_state.get(f"grade_{i}", None)
+            credit = st.session_state.get(f"credit_{i}", None)
+
+            if course:
+                courses.append(course)
+                credits.append(credit)
+                grades.append(grade)
+
+        st.session_state.forecast = (transcript["key"], courses, credits, grades, None)
+
+    forecast = st.session_state.get("forecast")
+    if forecast is not None and forecast[0] == transcript["key"]:
+        try:
+            _, courses, credits, grades, scenario = forecast
+            engine = profiler.run("forecast_engine", forecast_engine, transcript)
+
+            # Saved scenarios reuse their stored result for this parser
+            result = store.result(scenario, transcript["parser"]) if scenario is not None else None
+            if result is None:
+                result = profiler.run("run_forecast", run_forecast, df_gpa_courses, courses, credits, grades, institution_class, engine)
+                if scenario is not None:
+                    store.put_result(scenario, transcript["parser"], result)
+            base, simulated, df_simulation = result
+            show_forecast(base, simulated)
+
+            # Offered only once the inputs have produced a forecast
+            if store is not None:
+                def save_scenario():
+                    name = st.session_state.get("scenario_name", "").strip()
+                    if name:
+                        inputs = {
+                            "courses": courses, "credits": credits, "grades": grades,
+                            "target": st.session_state.target_gpa, "spread": st.session_state.grade_spread,
+                        }
+                        saved = store.save(transcript["digest"], name, inputs)
+                        st.session_state.forecast = (transcript["key"], courses, credits, grades, saved)
+
+                col1, col2, _ = st.columns([4, 1, 5], vertical_alignment="bottom")
+                with col1:
+                    st.text_input("Scenario name", key="scenario_name")
+                with col2:
+                    st.button("Save", on_click=save_scenario, width="stretch")
+
+            panel("Chart", "simplot",
+                  profiler.run, "plot sim", plot, df_simulation.reset_index(names="sim"), "sim")
+            panel("Table", "simtable", show_table, "#### Forecasted Courses (GPA)", df_simulation.drop(columns=["x_addition"]))
+            panel("Distribution", "simdist",
+                  profiler.run, "plot_distribution simdist", plot_distribution, df_simulation, "simdist", institution_class)
+            panel("Target GPA", "target",
+                  profiler.run, "target_outlook", target_outlook, engine, courses, credits, grades,
+                  st.session_state.target_gpa, st.session_state.grade_spread)
+
+        except KeyError:
+            st.write("Enter information for at least one course to prompt a forecast.")
+
+    if set_debug_mode:
+        st.markdown("#### Forecast Stage Timings;")
+        st.write(profiler.table())
+
+    if profile_stages:
+        profiler.emit()
 
 
 def main():
@@ -137,54 +553,101 @@ def main():
     st.markdown("# Transcript Reader")
     st.write("")
 
-    col1, _ = st.columns([4, 10])
+    col1, col2, _ = st.columns([4, 4, 6])
     with col1:
         option = st.selectbox(
             "Select your institution",
-            ["Select an Institution", "Trent University"],
+            ["Select an Institution", *INSTITUTIONS],
+        )
+    with col2:
+        policy = st.selectbox(
+            "Retaken courses count",
+            REPLACEMENT_POLICIES,
+            format_func=POLICY_LABELS.get,
         )
-
-    institution_class = (
-        TrentUniversity if option == "Trent University" else TranscriptReader
-    )  # Temporary until additional institutions are supported
 
     st.write("")
-    content = institution_class.get_example()
-    target = st.file_uploader("Upload your transcript or select an institution for a preview.", type=["pdf"])
+    targets = st.file_uploader(
+        "Upload one or more transcripts or select an institution for a preview.",
+        type=["pdf"],
+        accept_multiple_files=True,
+    )
     st.write("___")
 
+    target = targets[0] if len(targets) == 1 else None
+    if len(targets) > 1:
+        st.markdown(f"## Transcript Comparison ({len(targets)} files)")
+        comparison = compare_transcripts(targets, policy)
+        st.dataframe(comparison, hide_index=True)
+        parsed = comparison.index[comparison["Error"].isna()].tolist()
+        if not parsed:
+            return
+        selected = st.selectbox(
+            "Show transcript",
+            parsed,
+            format_func=lambda i: comparison.at[i, "File"],
+        )
+        target = targets[selected]
+        st.write("___")
+
+    if target is not None:
+        try:
+            detected = detect_upload(target.getvalue())
+        except ValueError:
+            detected = None
+        if detected is None:
+            st.write("\nTranscript Read Error: The uploaded file is not a transcript from a supported institution.")
+            return
+        if option not in ("Select an Institution", detected):
+            st.info(f"This looks like a {detected} transcript, so it is read as one.")
+        option = detected
+
+    institution_class = INSTITUTIONS.get(option, TranscriptReader)
+
+    profiler = StageProfiler(
+        enabled=set_debug_mode or profile_stages,
+        context={"institution": institution_class.__name__},
+    )
+    content = institution_class.get_example()
+
     if option != "Select an Institution":
         try:
 
             if target is not None:
-                content = institution_class.validate_pdf(target)
+                data = target.getvalue()
+                digest = hashlib.sha256(data).hexdigest()
+                transcript_key = get_parse_cache().key(data, institution_class, policy)
+                content, df_all_courses, df_gpa_courses = get_parse_cache().parse(
+                    data, institution_class, profiler, policy
+                )
+                cohort = get_cohort_store(institution_class, institution_class.__name__)
+                if cohort is not None:
+                    profiler.run("cohort_append", cohort.append, digest, df_all_courses, df_gpa_courses)
                 st.markdown(f"## {option} Transcript Summary")
             else:
+                digest = f"example-{institution_class.__name__}"
+                transcript_key = f"example-{institution_class.__name__}-{institution_class.parser_version()}-{policy}"
+                df_all_courses = profiler.run("parse_courses", institution_class.parse_courses, content)
+                df_gpa_courses = profiler.run("remove_replacements", institution_class.remove_replacements, df_all_courses, policy)
                 st.markdown(f"## {option} Transcript Preview")
 
-            df_unprocessed = institution_class.list_to_df(content)
-            df_all_courses = institution_class.clean_dataframe(df_unprocessed.copy())
-            df_gpa_courses = institution_class.remove_replacements(df_all_courses.copy())
-
             st.markdown("")
             st.markdown("### GPA Information")
 
             col1, col2, col3, _, _ = st.columns(5)
             with col1:
-                st.metric("Grade Point Average (GPA)", institution_class.get_gpa(df_gpa_courses), border=True)
+                st.metric("Grade Point Average (GPA)", profiler.run("get_gpa", institution_class.get_gpa, df_gpa_courses), border=True)
             with col2:
-                st.metric("Average Grade", f"{institution_class.get_average(df_gpa_courses)}%", border=True)
+                st.metric("Average Grade", f"{profiler.run('get_average', institution_class.get_average, df_gpa_courses)}%", border=True)
             with col3:
                 st.metric("Total Credits Earned", df_gpa_courses['Credits'].sum(), border=True)
             st.write("")
 
-            with st.expander("Chart"):
-                plot(df_gpa_courses.reset_index(names="no_sim"), "gpaplot")
-            with st.expander("Table"):
-                st.markdown("#### GPA Course Data Table")
-                st.write(df_gpa_courses)
-            with st.expander("Distribution"):
-                plot_distribution(df_gpa_courses,"gpadist", institution_class)
+            panel("Chart", "gpaplot",
+                  profiler.run, "plot gpaplot", plot, df_gpa_courses.reset_index(names="no_sim"), "gpaplot")
+            panel("Table", "gpatable", show_table, "#### GPA Course Data Table", df_gpa_courses)
+            panel("Distribution", "gpadist",
+                  profiler.run, "plot_distribution gpadist", plot_distribution, df_gpa_courses, "gpadist", institution_class)
 
             if target is not None:
                 st.markdown("")
@@ -200,104 +663,27 @@ def main():
                     )
 
                 st.write("")
-                with st.expander("Table"):
-                    st.markdown("#### Total Courses Completed")
-                    st.write(df_all_courses)
-                with st.expander("Distribution"):
-                    plot_distribution(df_all_courses,"totaldist", institution_class)
-
-            if "num_courses" not in st.session_state:
-                st.session_state.num_courses = 1
-            if st.session_state.num_courses == 0:
-                st.session_state.num_courses = 1
-            def clear_all():
-                st.session_state.num_courses = 1
-                st.session_state["course_0"] = ""
-                st.session_state["grade_0"] = 0
-            def add_course():
-                st.session_state.num_courses += 1
-            def delete_course():
-                if st.session_state.num_courses > 1:
-                    st.session_state.num_courses -= 1
-                else:
-                    clear_all()
-
-            st.write("___")
-            st.markdown(
-                "## GPA Forecasting",
-                help="Course Name: The name of the course you are intending to add or replace (see the \"Course Name\" column in the data table).\n\nAnticipated Grade: The final grade you are expecting to receive for this course.\n\nCredits: O.5 for half credit \"H\" courses (1 semester), 1 for full credit \"Y\" courses (2 semesters).",
-            )
-            st.markdown("##### **Enter your course details below to forecast your GPA**")
-            st.write("")
-            st.button("**+**", on_click=add_course)
-            st.button("**–**", on_click=delete_course)
-
-            with st.form(key="row", border=True):
-                for i in range(st.session_state.num_courses):
-
-                    header1, header2, header3 = (
-                        ("Course Name", "Anticipated Grade", "Credits")
-                        if i == 0
-                        else ("Course Name", "Anticipated Grade", "Credits")
-                    )
-
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.write("")
-                        st.text_input(f"{header1}", key=f"course_{i}")
-                    with col2:
-                        st.write("")
-                        st.number_input(
-                            f"{header2}",
-                            min_value=0,
-                            max_value=100,
-                            step=1,
-                            key=f"grade_{i}",
-                        )
-                    with col3:
-                        st.write("")
-                        st.number_input(
-                            f"{header3}",
-                            min_value=0.5,
-                            max_value=1.0,
-                            step=0.5,
-                            key=f"credit_{i}",
-                        )
-                    st.write("___")
-
-                submit = st.form_submit_button("Forecast")
-
-            if submit:
-                try:
-                    courses, credits, grades = [], [], []
-
-                    for i in range(st.session_state.num_courses):
-                        course = st.session_state.get(f"course_{i}", "").strip()
-                        grade = st.session_state.get(f"grade_{i}", None)
-                        credit = st.session_state.get(f"credit_{i}", None)
-
-                        if course:
-                            courses.append(course)
-                            credits.append(credit)
-                            grades.append(grade)
-
-                    df_simulation = simulator(df_gpa_courses, courses, credits, grades, institution_class)
-
-                    with st.expander("Chart"):
-                        plot(df_simulation.reset_index(names="sim"), "sim")
-                    with st.expander("Table"):
-                        st.markdown("#### Forecasted Courses (GPA)")
-                        st.write(df_simulation.drop(columns=["x_addition"]))
-                    with st.expander("Distribution"):
-                        plot_distribution(df_simulation, "simdist", institution_class)
-
-                except KeyError:
-                    st.write("Enter information for at least one course to prompt a forecast.")
+                panel("Table", "totaltable", show_table, "#### Total Courses Completed", df_all_courses)
+                panel("Distribution", "totaldist",
+                      profiler.run, "plot_distribution totaldist", plot_distribution, df_all_courses, "totaldist", institution_class)
+
+            st.session_state.transcript = {
+                "key": transcript_key,
+                "digest": digest,
+                "parser": f"{institution_class.__name__}-{institution_class.parser_version()}-{policy}"
+                          f"-r{FORECAST_RESULT_FORMAT}",
+                "institution": institution_class,
+                "df_gpa_courses": df_gpa_courses,
+            }
+            forecasting()
 
             if set_debug_mode:
                 views = {
-                    "---- \n\n## Debug Mode\n\n#### list_to_df() Result;": df_unprocessed,
-                    "#### clean_dataframe() (Prod. Grade) Result;": df_all_courses,
+                    "---- \n\n## Debug Mode\n\n#### Stage Timings;": profiler.table(),
+                    "#### Parse Cache;": get_parse_cache().stats(),
+                    "#### Cohort Store;": getattr(get_cohort_store(institution_class, institution_class.__name__), "stats", dict)(),
+                    "#### list_to_df() Result;": institution_class.list_to_df(content),
+                    "#### parse_courses() (Prod. Grade) Result;": df_all_courses,
                     "#### remove_replacements() (Prod. Grade) Result;": df_gpa_courses,
                     "#### validate_pdf() Result;": content,
                 }
@@ -305,6 +691,9 @@ def main():
                     st.markdown(heading)
                     st.write(view)
 
+            if profile_stages:
+                profiler.emit()
+
         except ValueError:
             st.write("\nTranscript Read Error: Please verify that the provided transcript matches the selected University.")
 
@@ -315,6 +704,9 @@ if __name__ == "__main__":
                    page_icon="📚",
                    )
     set_debug_mode = False
+    profile_stages = os.environ.get("TRANSCRIPT_PROFILE", "") not in ("", "0")
+    if profile_stages:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
     st.markdown("""
             <style>
             .block-container {
@@ -1,9 +1,145 @@
+from __future__ import annotations
+import mmap
+import os
 import re
-import pandas as pd
-import numpy as np
-from pypdf import PdfReader
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import cached_property
+from typing import TYPE_CHECKING, BinaryIO
+from lazyimport import lazy_import
+
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+pypdf = lazy_import("pypdf")
+
+if TYPE_CHECKING:
+    from numpy.typing import ArrayLike
+
+
+# Paths are memory-mapped so pages are read from the OS page cache rather
+# than buffered whole; file-like objects (e.g. uploads) are used as given.
+@contextmanager
+def open_pdf(target: str | os.PathLike | BinaryIO) -> Iterator[BinaryIO]:
+    if not isinstance(target, (str, os.PathLike)):
+        yield target
+        return
+    with open(target, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield f
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+# Percentage grades are converted through a 0-100 lookup table; anything
+# outside it (fractional or out-of-range marks) falls back to searchsorted
+# over the level breakpoints. Arrays are built on first use.
+class GradeScale:
+
+    def __init__(self, levels: list[tuple[float, float]]) -> None:
+        self.levels = sorted(levels)
+
+    @cached_property
+    def breakpoints(self) -> np.ndarray:
+        return np.array([level for level, _ in self.levels], dtype=np.float64)
+
+    @cached_property
+    def points(self) -> np.ndarray:
+        return np.array([gpa for _, gpa in self.levels], dtype=np.float64)
+
+    @cached_property
+    def table(self) -> np.ndarray:
+        return self._search(np.arange(101))
+
+    def _search(self, grades: np.ndarray) -> np.ndarray:
+        index = np.searchsorted(self.breakpoints, grades, side="right") - 1
+        return self.points[np.clip(index, 0, None)]
+
+    def convert(self, grades: ArrayLike) -> np.ndarray:
+        grades = np.asarray(grades)
+        if grades.dtype.kind in "iu" and grades.size and grades.min() >= 0 and grades.max() <= 100:
+            return self.table[grades]
+        return self._search(grades.astype(np.float64, copy=False))
+
+
+GRADE_SCALES: dict[int, GradeScale] = {}
+
+def register_scale(scale: int, levels: list[tuple[float, float]]) -> GradeScale:
+    GRADE_SCALES[scale] = GradeScale(levels)
+    return GRADE_SCALES[scale]
+
+# https://www.ouac.on.ca/guide/undergraduate-grade-conversion-table
+register_scale(3, [
+    (90, 4.0),
+    (85, 3.9),
+    (80, 3.7),
+    (77, 3.3),
+    (73, 3.0),
+    (70, 2.7),
+    (67, 2.3),
+    (63, 2.0),
+    (60, 1.7),
+    (57, 1.3),
+    (53, 1.0),
+    (50, 0.7),
+    (0, 0),
+])
+
+
+GRADE_BIN_EDGES = [-1e-10] + [5.0 * i for i in range(1, 21)]
+GRADE_BIN_LABELS = [f"({a}, {b}]" for a, b in zip(GRADE_BIN_EDGES[:-1], GRADE_BIN_EDGES[1:])]
+
+# 5-point bin per grade, right-inclusive like pd.cut over GRADE_BIN_EDGES;
+# -1 for grades outside them
+def grade_bins(grades: ArrayLike) -> np.ndarray:
+    grades = np.asarray(grades, dtype=np.float64)
+    bins = np.maximum(np.ceil(grades / 5).astype(np.int64) - 1, 0)
+    return np.where((grades > GRADE_BIN_EDGES[0]) & (grades <= 100), bins, -1)
+
+def grade_histogram(grades: ArrayLike) -> np.ndarray:
+    bins = grade_bins(grades)
+    return np.bincount(bins[bins >= 0], minlength=len(GRADE_BIN_LABELS))
+
+# Which attempt of a retaken course counts: the highest grade, the most
+# recent (last on the transcript), or the one the transcript marks with "R",
+# falling back to the highest grade when no attempt is marked. Ties keep the
+# earliest attempt.
+REPLACEMENT_POLICIES = ("highest", "recent", "marker")
+
+# Attempts sharing a course name are resolved first, then the survivors
+# sharing a course code, matching the name-then-code idxmax passes this
+# replaces. Rows are ranked once by the policy and each pass is a hashed
+# first-occurrence dedup over integer keys. With `within` (e.g. a file
+# column), many transcripts are resolved in one call.
+def resolve_replacements(df: pd.DataFrame, policy: str = "highest", within: str | None = None) -> pd.DataFrame:
+    n = len(df)
+    position = np.arange(n)
+    grades = df["Grade"].to_numpy()
+    if policy == "highest":
+        order = np.lexsort((position, -grades.astype(np.int64)))
+    elif policy == "recent":
+        order = position[::-1]
+    elif policy == "marker":
+        order = np.lexsort((position, -grades.astype(np.int64), ~df["Replaced"].to_numpy(dtype=bool)))
+    else:
+        raise ValueError(f"Unknown replacement policy: {policy}")
+
+    partition = pd.factorize(df[within])[0].astype(np.int64) if within else np.zeros(n, dtype=np.int64)
+    keep = order
+    for column in ("Course Name", "Course Code"):
+        key = pd.factorize(df[column])[0].astype(np.int64)
+        key = np.where(key < 0, key.max(initial=0) + 1 + position, key)  # unnamed rows never merge
+        key = partition * (2 * n + 1) + key
+        keep = keep[~pd.Index(key[keep]).duplicated()]
+
+    return df.take(np.sort(keep)).reset_index(drop=True)
+
 
 class TranscriptReader:
+    def parser_version() -> int:
+        return
+    def matches(first_page: str) -> bool:
+        return False
     def get_example() -> list[str]:
         return
     def validate_pdf(target: str) -> list[str]:
@@ -12,59 +148,75 @@ class TranscriptReader:
         return
     def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
         return
-    def remove_replacements(df: pd.DataFrame) -> pd.DataFrame:
+    def parse_courses(items: list[str]) -> pd.DataFrame:
+        return
+    def remove_replacements(df: pd.DataFrame, policy: str = "highest") -> pd.DataFrame:
         return
     def get_average(df: pd.DataFrame) -> float:
         return
     def get_gpa(df: pd.DataFrame) -> float:
         return
-    def gpa_conversion(scale: int, grades: list[float]) -> float: # https://www.ouac.on.ca/guide/undergraduate-grade-conversion-table
-        if (scale==3):
-            levels = [
-                (90, 4.0),
-                (85, 3.9),
-                (80, 3.7),
-                (77, 3.3),
-                (73, 3.0),
-                (70, 2.7),
-                (67, 2.3),
-                (63, 2.0),
-                (60, 1.7),
-                (57, 1.3),
-                (53, 1.0),
-                (50, 0.7),
-                (0, 0),
-            ]
-        else:
-            return ""
-        def convert(grade):
-            for level, gpa in levels:
-                if grade >= level:
-                    return gpa
-        return [convert(p) for p in grades]
+    def gpa_conversion(scale: int, grades: ArrayLike) -> np.ndarray:
+        if scale not in GRADE_SCALES:
+            raise ValueError(f"Unknown grade scale: {scale}")
+        return GRADE_SCALES[scale].convert(grades)
+
+    # GPA points are summed as integer thousandths so the rounded GPA does
+    # not depend on summation order (e.g. running totals vs. one pass).
+    # The mean is rounded half up to two places in integer arithmetic, so
+    # an exact 3.675 is always 3.68 whatever its float representation. With
+    # no graded courses the GPA is NaN, like get_average.
+    def gpa_points(gpa: ArrayLike) -> np.ndarray:
+        return np.rint(np.asarray(gpa, dtype=np.float64) * 1000).astype(np.int64)
+    def round_gpa(points: int | np.ndarray, weight: int) -> float | np.ndarray:
+        if not weight:
+            return float("nan")
+        return (points + weight * 5) // (weight * 10) / 100
 
 class TrentUniversity(TranscriptReader):   
 
     def scale() -> int:
         return 3
 
+    # Bump whenever parsing output changes; invalidates cached parses.
+    def parser_version() -> int:
+        return 2
+
     def get_example() -> list[str]:
         return " Trent University                                           1600 "," West Bank Drive                                         "," Peterborough, Ontario                                          K 9 H  0 G 2 , Canada                                  "," To: Anonymous User                                                           4 "," Water St                                          "," Page:    1  of    2           "," Peterborough ON K 9 H  3 M 2                                   "," Student Number:   9999999                                                                    "," Date of Birth : "," Jan  30                                                                           "," Issued On     :   2025 "," Apr  22                                                                                                     "," Name: Anonymous User                                                             "," Undergraduate                                                        "," Creds Mark Grade  R        __________________________________________________________________________________________                  "," Trent National Renewable Scholarship - Fall          "," Trent National renewable Scholarship - Winter                                 "," Business Administration        0000 H: Course0       0.5     71    B-              "," Economics                      0001 H:  Course1      0.5     75    B               "," Economics                      0002 H: Course2      0.5     72    B-              "," Indigenous Studies             0003 H: Course3    0.5     90    A+              "," Business Administration        0004 H: Course4             0.5     75    B               "," Computer Science                      0005 H: Course5        0.5     89    A               "," Computer Science     0006 H: Course6   0.5     77    B+              "," Indigenous Studies             0007 H: Course7     0.5     75    B               "," Media Studies                  0008 H: Course8                   0.5     92    A+                                          "," Sociology                      0009 H: Course9      0.5     85    A-                                            DEAN'S HONOUR ROLL                                 "," Business Administration        0010 H: Course16        0.5     92    A+              "," Business Administration        0011 H: Course10         0.5     96    A+               "," Business Administration        0012 H: Course11        0.5     86    A               "," Business Administration        0013 H: Course12              0.5     75    B               "," Economics                      0014 H: Course99            0.5     52    D-              "," Business Administration        0015 H: Course14                0.5     84    A-              "," Business Administration        0016 H: Course13                0.5     73    B               "," Business Administration        0017 H: Course17           0.5     85    A               "," Economics                      0018 H: Course18   0.5     71    B-              "," Economics                      0019 H: Course99            0.5     78    B+    R                                     "," Business Administration        1999 H: Course100       0.5     61    C-                                      "," Business Administration        0020 H: Course100       0.5     80    A-    R         "," Business Administration        0021 H: Course19                      0.5     85    A               "," Business Administration        0022 H: Course20          0.5     92    A+              "," Business Administration        0023 H: Course21       0.5     81    A-              "," Business Administration        0024 H: Course22       0.5     85    A              "," Economics                      0025 H: Course23   0.5     90    A+              "," Business Administration        0026 H: Course24    0.5     80    A-              "," Business Administration        0027 H: Course25             0.5     80    A-              "," Business Administration        0028 H: Course26         0.5     90    A+              "," Business Administration        0029 H: Course27     0.5     85    A               "," Business Administration        0030 H: Course28   0.5     95    A+                                            DEAN'S HONOUR ROLL                                     "," Computer Science               0031 H: Course29                     0.5     93    A+                                            DEAN'S HONOUR ROLL                                                                     \f                                                          "," Trent University                                           1600 "," West Bank Drive                                         "," Peterborough, Ontario                                          K 9 H  0 G 2 , Canada                                  "," To: Anonymous User                                                           4 "," Water St                                          "," Page:    2  of    2           "," Peterborough ON K 9 H  3 M 2                                   "," Student Number:   9999999                                                                    "," Date of Birth : "," Jan  30                                                                           "," Issued On     :   2025 "," Apr  22                                                                                                     "," Name: Anonymous User                                                             "," Undergraduate                                                        "," Creds Mark Grade  R        __________________________________________________________________________________________                  "," Trent National Renewable Scholarship - Fall          "," Trent National renewable Scholarship - Winter                                 "," Business Administration        0032 H: Course32          0.5     81    A-              "," Business Administration        0033 H: Course30             0.5     85    A               "," Business Administration        0034 H: Course31   0.5     83    A-              "," Computer Science               0035 H: Course33    0.5     88    A               "," Business Administration        0036 H: Course34                            "," Business Administration        0037 H: Course35      0.5     88    A               "," Communications                 0038 H: Course36                                           "," Political Science        0039 H: Course37                             "," Philosophy                     0040 H: Course38                                                                "," Current Academic Status : Good Standing                                                                                                 *** End of UNOFFICIAL Record *** "
 
-    def validate_pdf(target: str) -> list[str]:
-        def apply_regex(pdf: str) -> str:
-            pdf = re.sub(r"---+", "", pdf)
-            pdf = re.sub(r"\n", " ", pdf)
-            pdf = re.sub(r"\b\d{4}-\d{4}\s+Academic Year\b", "", pdf)
-            pdf = re.sub(r"\b\d{4}\s+\w\w Summer Term\b", "", pdf)
-            return re.sub(r"(?<=\s)(?= [A-Z][a-z]+(?: [A-Z][a-z]+)*)", "\n", pdf)
-
-        transcript, content = PdfReader(target), ""
-        for page in transcript.pages:
-            page_text = page.extract_text()
-            if page_text:
-                content += apply_regex(page_text)
-        return [i for i in content.split("\n") if i.strip()]
+    SIGNATURE = re.compile(r"Trent University\s+1600\s+West Bank Drive.*?Creds\s+Mark\s+Grade", re.S)
+    RULE = re.compile(r"---+")
+    TERM_HEADING = re.compile(r"\b\d{4}-\d{4}\s+Academic Year\b|\b\d{4}\s+\w\w Summer Term\b")
+    LINE_START = re.compile(r"(?<=\s)(?= [A-Z][a-z]+(?: [A-Z][a-z]+)*)")
+    END_OF_RECORD = "*** End of UNOFFICIAL Record ***"
+
+    def matches(first_page: str) -> bool:
+        return TrentUniversity.SIGNATURE.search(first_page) is not None
+
+    def normalize_page(text: str) -> str:
+        text = TrentUniversity.RULE.sub("", text).replace("\n", " ")
+        text = TrentUniversity.TERM_HEADING.sub("", text)
+        return TrentUniversity.LINE_START.sub("\n", text)
+
+    # Yields transcript lines one page at a time. A line may continue onto
+    # the next page, so the last fragment of each page is carried forward.
+    def iter_lines(target: str | BinaryIO) -> Iterator[str]:
+        with open_pdf(target) as stream:
+            carry = ""
+            for page in pypdf.PdfReader(stream).pages:
+                page_text = page.extract_text()
+                if not page_text:
+                    continue
+                *lines, carry = (carry + TrentUniversity.normalize_page(page_text)).split("\n")
+                yield from (line for line in lines if line.strip())
+                if TrentUniversity.END_OF_RECORD in page_text:
+                    break
+            if carry.strip():
+                yield carry
+
+    def validate_pdf(target: str | BinaryIO) -> list[str]:
+        return list(TrentUniversity.iter_lines(target))
 
     # Strip sentences split by >three whitespace for column entries;
     # Iterate for each line of the list as a new row.
@@ -110,10 +262,41 @@ class TrentUniversity(TranscriptReader):
             .drop(columns=["index"])
         )
 
-    def remove_replacements(df: pd.DataFrame) -> pd.DataFrame:
-        df = df.loc[df.groupby("Course Name")["Grade"].idxmax()]
-        df = df.loc[df.groupby("Course Code")["Grade"].idxmax()]
-        return df.sort_index().reset_index().drop(columns=["index"])
+    # Single-pass equivalent of list_to_df + clean_dataframe that builds typed
+    # columns directly; also keeps the major and the "R" replaced marker.
+    # Lines are split the same way, and rows without a grade or marked
+    # "PRE" (courses not taken yet) are skipped.
+    def parse_courses(items: list[str]) -> pd.DataFrame:
+        majors, codes, names, credits, grades, letters, replaced = [], [], [], [], [], [], []
+        for item in items:
+            fields = [i.strip() for i in item.split("   ") if i.strip()]
+            if len(fields) > 6:
+                raise ValueError(f"Unrecognized transcript line: {item.strip()}")
+            if len(fields) < 4 or fields[3] == "PRE":
+                continue
+
+            major, course = fields[0], fields[1].split(":", 1)
+            letter = fields[4] if len(fields) > 4 else None
+            majors.append(major)
+            codes.append(f"{major} {course[0]}".strip())
+            names.append(course[1].strip() if len(course) > 1 else None)
+            credits.append(float(fields[2]))
+            grades.append(int(fields[3]))
+            letters.append(None if letter == "R" else letter)
+            replaced.append(letter == "R" or (len(fields) > 5 and fields[5] == "R"))
+
+        return pd.DataFrame({
+            "Course Code": pd.Categorical(codes),
+            "Course Name": names,
+            "Credits": np.array(credits, dtype=np.float32),
+            "Grade": np.array(grades, dtype=np.int16),
+            "Letter Grade": letters,
+            "Major": pd.Categorical(majors),
+            "Replaced": np.array(replaced, dtype=bool),
+        })
+
+    def remove_replacements(df: pd.DataFrame, policy: str = "highest") -> pd.DataFrame:
+        return resolve_replacements(df, policy)
 
     def get_average(input: pd.DataFrame) -> float:
         df = input.copy()
@@ -128,12 +311,37 @@ class TrentUniversity(TranscriptReader):
         else:
             return round(df["Grade"].mean(), 2)
         
+    # Full credit "Y" courses count twice toward the GPA
     def get_gpa(input: pd.DataFrame) -> int:
-        input["GPA"] = TranscriptReader.gpa_conversion(TrentUniversity.scale(), input["Grade"])
-        df = input.copy()
-        if (df["Credits"] == 1).any():
-            df = pd.concat([df, df[df["Credits"] == 1]],
-                           ignore_index=True,
-                           )
-        gpa = TranscriptReader.gpa_conversion(TrentUniversity.scale(), df["Grade"])
-        return round(np.mean(gpa),2)
+        gpa = TranscriptReader.gpa_conversion(TrentUniversity.scale(), input["Grade"])
+        input["GPA"] = gpa
+        weights = np.where(input["Credits"].to_numpy() == 1, 2, 1)
+        points = int((TranscriptReader.gpa_points(gpa) * weights).sum())
+        return TranscriptReader.round_gpa(points, int(weights.sum()))
+
+
+INSTITUTIONS: dict[str, type[TranscriptReader]] = {}
+
+def register_institution(name: str, institution_class: type[TranscriptReader]) -> type[TranscriptReader]:
+    INSTITUTIONS[name] = institution_class
+    return institution_class
+
+register_institution("Trent University", TrentUniversity)
+
+
+# Only the first page is extracted, so picking a parser costs one page
+# rather than a full parse
+def first_page_text(target: str | os.PathLike | BinaryIO) -> str:
+    with open_pdf(target) as stream:
+        try:
+            reader = pypdf.PdfReader(stream)
+            return reader.pages[0].extract_text() if len(reader.pages) else ""
+        except pypdf.errors.PyPdfError as e:
+            raise ValueError(f"Unreadable PDF: {e}") from e
+
+def detect_institution(target: str | os.PathLike | BinaryIO) -> str | None:
+    text = first_page_text(target)
+    for name, institution_class in INSTITUTIONS.items():
+        if institution_class.matches(text):
+            return name
+    return None